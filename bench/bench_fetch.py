@@ -0,0 +1,76 @@
+"""Загрузка карточек вакансий с фейкового HH: последовательно против параллельного HHClient.
+
+    python -m bench.bench_fetch --vacancies 300 --latency 0.05 --concurrency 1,5,10,20
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from bench.fake_hh import FakeHH
+from bench.stats import print_table, summary
+from config.config import HHConfig
+import services.hh_parser as hh_parser
+
+
+def hh_config(concurrency: int, rate_limit: float) -> HHConfig:
+    # кэш ответов выключен (TTL 0, сервер не шлёт валидаторов): меряем сеть, а не LRU
+    return HHConfig(concurrency=concurrency, rate_limit=rate_limit, max_retries=3,
+                    ingest_interval=300, cache_size=1000, cache_dir=None,
+                    search_cache_ttl=0, vacancy_cache_ttl=0,
+                    cache_disk_max_entries=0)
+
+
+async def run(ids: list[str], concurrency: int, rate_limit: float) -> dict:
+    client = hh_parser.HHClient(hh_config(concurrency, rate_limit))
+    await client.start()
+    latencies = []
+    first_result = None
+    started = time.perf_counter()
+
+    async def fetch(vac_id):
+        call_started = time.perf_counter()
+        data = await hh_parser.fetch_vacancy(client, vac_id)
+        latencies.append(time.perf_counter() - call_started)
+        return data
+
+    fetched = 0
+    for future in asyncio.as_completed([fetch(vac_id) for vac_id in ids]):
+        if await future is not None:
+            fetched += 1
+            if first_result is None:
+                first_result = time.perf_counter() - started
+    elapsed = time.perf_counter() - started
+    await client.close()
+    return {
+        'concurrency': concurrency,
+        'fetched': fetched,
+        'seconds': elapsed,
+        'per_second': fetched / elapsed,
+        'first_ms': (first_result or 0) * 1000,
+        **summary(latencies),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vacancies', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка ответа фейкового HH, сек')
+    parser.add_argument('--concurrency', default='1,5,10,20')
+    parser.add_argument('--rate-limit', type=float, default=1000.0, help='запросов в секунду на хост')
+    parser.add_argument('--throttle-every', type=int, default=0, help='каждый n-й запрос получает 429')
+    args = parser.parse_args()
+
+    server = FakeHH(args.vacancies, args.latency, args.throttle_every)
+    hh_parser.HH_API_URL = await server.start()
+    rows = []
+    for concurrency in (int(value) for value in args.concurrency.split(',')):
+        rows.append(await run(server.ids, concurrency, args.rate_limit))
+    await server.close()
+    print_table(rows, ['concurrency', 'fetched', 'seconds', 'per_second', 'first_ms', 'p50_ms', 'p99_ms'])
+    print(f"запросов к серверу: {server.requests}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main())
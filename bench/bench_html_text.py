@@ -0,0 +1,50 @@
+"""Извлечение текста описаний: потоковый html_to_text против BeautifulSoup.get_text().
+
+    python -m bench.bench_html_text --repeat 200
+"""
+import argparse
+import time
+import warnings
+
+from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
+
+from bench.fake_hh import load_corpus
+from bench.stats import print_table
+from services.html_text import html_to_text
+
+
+# в корпусе есть описание с <?xml ...?>: bs4 предупреждает, но разбирает его как HTML
+warnings.filterwarnings('ignore', category=XMLParsedAsHTMLWarning)
+
+
+def bs4_text(html: str) -> str:
+    return BeautifulSoup(html, 'html.parser').get_text()
+
+
+def measure(name: str, extract, descriptions: list[str], repeat: int) -> dict:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for html in descriptions:
+            extract(html)
+    elapsed = time.perf_counter() - started
+    calls = repeat * len(descriptions)
+    return {'parser': name, 'calls': calls, 'seconds': elapsed, 'us_per_call': elapsed / calls * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200, help='сколько раз пройти по корпусу')
+    args = parser.parse_args()
+
+    descriptions = [item['description'] for item in load_corpus() if item.get('description')]
+    mismatched = sum(html_to_text(html) != bs4_text(html) for html in descriptions)
+    rows = [
+        measure('bs4', bs4_text, descriptions, args.repeat),
+        measure('html_to_text', html_to_text, descriptions, args.repeat),
+    ]
+    print_table(rows, ['parser', 'calls', 'seconds', 'us_per_call'])
+    print(f"ускорение: {rows[0]['seconds'] / rows[1]['seconds']:.1f}x, расхождений с bs4: {mismatched}")
+
+
+if __name__ == '__main__':
+    main()
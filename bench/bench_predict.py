@@ -0,0 +1,60 @@
+"""Пропускная способность CatBoost: по одной строке против одного Pool на батч.
+
+    python -m bench.bench_predict --rows 1000 --batch 1,10,100,1000
+"""
+import argparse
+import time
+
+from bench.fake_hh import load_corpus
+from bench.stats import print_table
+from models.ml_models import TaskModel, _labels
+from services.hh_parser import extract_vacancies
+
+
+def corpus_features(rows: int) -> list[dict]:
+    """Признаки rows вакансий из корпуса (по кругу) с грейдом, нужным модели зарплаты."""
+    corpus = load_corpus()
+    items = [dict(corpus[i % len(corpus)], id=str(i)) for i in range(rows)]
+    return [features for _, features in extract_vacancies(items)]
+
+
+def throughput(model: TaskModel, features: list[dict], batch: int, repeat: int) -> dict:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for start in range(0, len(features), batch):
+            model.predict(features[start:start + batch])
+        best = min(best, time.perf_counter() - started)
+    return {
+        'model': model.name,
+        'batch': batch,
+        'seconds': best,
+        'rows_per_second': len(features) / best,
+        'ms_per_row': best / len(features) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--batch', default='1,10,100,1000')
+    parser.add_argument('--repeat', type=int, default=3, help='берётся лучший из повторов')
+    parser.add_argument('--grade-model', default='grade_model_new')
+    parser.add_argument('--salary-model', default='salary_model_new')
+    args = parser.parse_args()
+
+    grade_model = TaskModel(args.grade_model, classifier=True)
+    salary_model = TaskModel(args.salary_model, classifier=False)
+    features = corpus_features(args.rows)
+    for feature, grade in zip(features, _labels(grade_model.predict(features))):
+        feature['grade'] = grade
+
+    rows = []
+    for batch in (int(value) for value in args.batch.split(',')):
+        for model in (grade_model, salary_model):
+            rows.append(throughput(model, features, batch, args.repeat))
+    print_table(rows, ['model', 'batch', 'seconds', 'rows_per_second', 'ms_per_row'])
+
+
+if __name__ == '__main__':
+    main()
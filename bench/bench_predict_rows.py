@@ -0,0 +1,58 @@
+"""Задержка одного вызова модели: pandas DataFrame + Pool против строк TaskModel.predict.
+
+    python -m bench.bench_predict_rows --batch 1,32,256 --repeat 200
+"""
+import argparse
+import time
+
+import pandas as pd
+from catboost import Pool
+
+from bench.bench_predict import corpus_features
+from bench.stats import print_table, summary
+from models.ml_models import TaskModel, _labels
+
+
+def predict_dataframe(model: TaskModel, features: list[dict]):
+    # прежний путь: DataFrame в порядке признаков модели и Pool из него
+    frame = pd.DataFrame(features, columns=model.features)
+    pool = Pool(data=frame, cat_features=model.cat_features, text_features=model.text_features)
+    return model.model.predict(pool)
+
+
+def latency(name: str, predict, model: TaskModel, features: list[dict], repeat: int) -> dict:
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        predict(model, features)
+        durations.append(time.perf_counter() - started)
+    return {'model': model.name, 'batch': len(features), 'path': name, **summary(durations)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch', default='1,32,256')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--grade-model', default='grade_model_new')
+    parser.add_argument('--salary-model', default='salary_model_new')
+    args = parser.parse_args()
+
+    grade_model = TaskModel(args.grade_model, classifier=True)
+    salary_model = TaskModel(args.salary_model, classifier=False)
+    batches = [int(value) for value in args.batch.split(',')]
+    features = corpus_features(max(batches))
+    for feature, grade in zip(features, _labels(grade_model.predict(features))):
+        feature['grade'] = grade
+
+    rows = []
+    for batch in batches:
+        for model in (grade_model, salary_model):
+            chunk = features[:batch]
+            same = (predict_dataframe(model, chunk) == model.predict(chunk)).all()
+            for name, predict in (('dataframe', predict_dataframe), ('rows', TaskModel.predict)):
+                rows.append({**latency(name, predict, model, chunk, args.repeat), 'same': bool(same)})
+    print_table(rows, ['model', 'batch', 'path', 'p50_ms', 'p99_ms', 'mean_ms', 'same'])
+
+
+if __name__ == '__main__':
+    main()
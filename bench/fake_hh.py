@@ -0,0 +1,97 @@
+"""Локальная замена api.hh.ru для бенчмарков: поиск и карточки вакансий из записанного корпуса."""
+from aiohttp import web
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import asyncio
+import json
+
+CORPUS_PATH = Path(__file__).parent / 'corpus' / 'vacancies.json'
+FIRST_ID = 200_000_000
+MAX_DEPTH = 2000   # как и HH, поиск не отдаёт результаты глубже 2000-го
+
+
+def load_corpus(path: Path = CORPUS_PATH) -> list[dict]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class FakeHH:
+    """HTTP-сервер с ответами в формате HH.
+
+    Вакансии равномерно опубликованы за span до минуты создания сервера. /vacancies
+    отдаёт ID из окна date_from–date_to постранично (per_page, page), /vacancies/{id} —
+    вакансию из корпуса по кругу с подменённым ID. latency — задержка каждого ответа, сек;
+    throttle_every — каждый n-й запрос карточки получает 429 (0 — без ограничений).
+    """
+
+    def __init__(self, vacancies: int = 1000, latency: float = 0.01, throttle_every: int = 0,
+                 corpus: list[dict] | None = None, span: timedelta = timedelta(days=1)):
+        self.vacancies = vacancies
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.corpus = corpus or load_corpus()
+        # fetch_hh_ids округляет конец окна до минуты: так в него попадают все вакансии
+        self.end = datetime.now(timezone.utc) - timedelta(minutes=1)
+        self.step = span / max(vacancies, 1)
+        self.requests = {'search': 0, 'vacancy': 0, 'throttled': 0}
+        self.url = ''
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def ids(self) -> list[str]:
+        return [str(FIRST_ID + i) for i in range(self.vacancies)]
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_get('/vacancies', self._search)
+        app.router.add_get('/vacancies/{id}', self._vacancy)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.url = f'http://{bound_host}:{bound_port}'
+        return self.url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def published_at(self, index: int) -> datetime:
+        return self.end - self.step * (self.vacancies - 1 - index)
+
+    async def _search(self, request: web.Request) -> web.Response:
+        self.requests['search'] += 1
+        await asyncio.sleep(self.latency)
+        per_page = int(request.query.get('per_page', 100))
+        page = int(request.query.get('page', 0))
+        date_from = datetime.fromisoformat(request.query['date_from']) if 'date_from' in request.query else None
+        date_to = datetime.fromisoformat(request.query['date_to']) if 'date_to' in request.query else None
+        ids = [
+            str(FIRST_ID + i) for i in range(self.vacancies)
+            if (date_from is None or self.published_at(i) >= date_from)
+            and (date_to is None or self.published_at(i) <= date_to)
+        ]
+        visible = min(len(ids), MAX_DEPTH)
+        chunk = ids[:visible][page * per_page:(page + 1) * per_page]
+        return web.json_response({
+            'found': len(ids),
+            'pages': (visible + per_page - 1) // per_page,
+            'page': page,
+            'per_page': per_page,
+            'items': [{'id': vac_id} for vac_id in chunk],
+        })
+
+    async def _vacancy(self, request: web.Request) -> web.Response:
+        self.requests['vacancy'] += 1
+        if self.throttle_every and self.requests['vacancy'] % self.throttle_every == 0:
+            self.requests['throttled'] += 1
+            return web.Response(status=429, headers={'Retry-After': '0'})
+        await asyncio.sleep(self.latency)
+        vac_id = request.match_info['id']
+        template = self.corpus[int(vac_id) % len(self.corpus)]
+        vacancy = {**template, 'id': vac_id, 'alternate_url': f'https://hh.ru/vacancy/{vac_id}'}
+        index = int(vac_id) - FIRST_ID
+        if 0 <= index < self.vacancies:
+            vacancy['published_at'] = self.published_at(index).strftime('%Y-%m-%dT%H:%M:%S%z')
+        return web.json_response(vacancy)
@@ -0,0 +1,112 @@
+"""Заглушки внешних систем для воспроизведения конвейера без сети и Postgres."""
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from services.profiles import DEFAULT_PROFILE, SearchProfile
+import asyncio
+import itertools
+
+
+class FakeBot:
+    """Вместо aiogram.Bot: записывает отправленные сообщения, latency — задержка ответа Telegram."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sent: list[tuple[int, int]] = []   # (chat_id, длина текста)
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append((chat_id, len(text)))
+
+
+class MemoryDatabase:
+    """Методы Database, которые вызывают загрузка и рассылка, поверх словарей в памяти.
+
+    latency — задержка каждого запроса, сек: имитирует сетевой круг до Postgres.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.vacancies: dict[int, dict] = {}
+        self.queries: dict[int, set[str]] = {}
+        self.users: dict[int, dict] = {}
+        self.calls: dict[str, int] = {}
+        self._seq = itertools.count(1)
+
+    def add_users(self, count: int, profiles: list[SearchProfile] = (DEFAULT_PROFILE,)):
+        """count пользователей с профилями по кругу; все созрели и ждут рассылки с начала."""
+        last_check = datetime.now(timezone.utc) - timedelta(hours=1)
+        for chat_id, profile in zip(range(1, count + 1), itertools.cycle(profiles)):
+            self.users[chat_id] = {
+                'chat_id': chat_id, 'update_interval': 60, 'last_check': last_check, 'last_seq': 0,
+                'area': profile.area, 'roles': list(profile.roles) if profile.roles else None,
+                'grade': profile.grade, 'min_salary': profile.min_salary,
+            }
+
+    async def _call(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    @asynccontextmanager
+    async def advisory_lock(self, key: int):
+        yield True
+
+    @asynccontextmanager
+    async def connection(self):
+        yield None
+
+    async def get_last_published_time(self):
+        await self._call('get_last_published_time')
+        # с запасом раньше любой вакансии FakeHH: загрузка забирает весь корпус
+        return datetime.now(timezone.utc) - timedelta(days=2)
+
+    async def get_search_profiles(self) -> list[SearchProfile]:
+        await self._call('get_search_profiles')
+        return list({SearchProfile.from_user(user) for user in self.users.values()})
+
+    async def insert_vacancy_queries(self, matches: list[tuple[str, str]]):
+        await self._call('insert_vacancy_queries')
+        for vac_id, query_key in matches:
+            self.queries.setdefault(int(vac_id), set()).add(query_key)
+
+    async def get_existing_ids(self, ids: list[str]) -> set[str]:
+        await self._call('get_existing_ids')
+        return {vac_id for vac_id in ids if int(vac_id) in self.vacancies}
+
+    async def insert_vacancies_bulk(self, vacancies: list[dict]) -> set[str]:
+        await self._call('insert_vacancies_bulk')
+        inserted = set()
+        for vacancy in vacancies:
+            vac_id = int(vacancy['id'])
+            if vac_id not in self.vacancies:
+                self.vacancies[vac_id] = {**vacancy, 'ingest_seq': next(self._seq)}
+                inserted.add(str(vac_id))
+        return inserted
+
+    async def get_all_users(self):
+        await self._call('get_all_users')
+        return [{key: user[key] for key in ('chat_id', 'update_interval', 'last_check')}
+                for user in self.users.values()]
+
+    async def claim_users(self, chat_ids: list[int], owner: str, lease_seconds: float):
+        await self._call('claim_users')
+        return [dict(self.users[chat_id]) for chat_id in chat_ids if chat_id in self.users]
+
+    async def renew_leases(self, chat_ids: list[int], owner: str, lease_seconds: float):
+        await self._call('renew_leases')
+
+    async def get_vacancies_after(self, last_seq: int, limit: int = 200):
+        await self._call('get_vacancies_after')
+        rows = sorted((v for v in self.vacancies.values() if v['ingest_seq'] > last_seq),
+                      key=lambda v: v['ingest_seq'])[:limit]
+        return [{**row, 'query_keys': sorted(self.queries.get(int(row['id']), ()))} for row in rows]
+
+    async def update_users_state(self, states: dict[int, tuple[datetime, int | None]],
+                                 owner: str | None = None):
+        await self._call('update_users_state')
+        for chat_id, (last_check, last_seq) in states.items():
+            user = self.users.get(chat_id)
+            if user is not None:
+                user['last_check'] = max(user['last_check'], last_check)
+                user['last_seq'] = max(user['last_seq'], last_seq or 0)
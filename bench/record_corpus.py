@@ -0,0 +1,46 @@
+"""Записывает корпус для бенчмарков: свежие вакансии с api.hh.ru по общему поисковому запросу.
+
+    python -m bench.record_corpus --limit 200 --hours 24
+"""
+import argparse
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+from bench.fake_hh import CORPUS_PATH
+from config.config import HHConfig
+import services.hh_parser as hh_parser
+
+
+async def record(limit: int, hours: int) -> list[dict]:
+    client = hh_parser.HHClient(HHConfig(
+        concurrency=5, rate_limit=5.0, max_retries=3, ingest_interval=0, cache_size=limit,
+        cache_dir=None, search_cache_ttl=0, vacancy_cache_ttl=0, cache_disk_max_entries=0))
+    try:
+        ids = await hh_parser.fetch_hh_ids(client, datetime.now(timezone.utc) - timedelta(hours=hours))
+        vacancies = await asyncio.gather(*(hh_parser.fetch_vacancy(client, vac_id)
+                                           for vac_id in sorted(ids)[:limit]))
+    finally:
+        await client.close()
+    return [vacancy for vacancy in vacancies if vacancy is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--limit', type=int, default=200, help='сколько вакансий записать')
+    parser.add_argument('--hours', type=int, default=24, help='за сколько последних часов искать')
+    parser.add_argument('--api-url', default=hh_parser.HH_API_URL)
+    parser.add_argument('--output', default=str(CORPUS_PATH))
+    args = parser.parse_args()
+
+    hh_parser.HH_API_URL = args.api_url
+    vacancies = asyncio.run(record(args.limit, args.hours))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(vacancies, f, ensure_ascii=False, indent=1)
+    print(f"Записано вакансий: {len(vacancies)} в {args.output}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -0,0 +1,218 @@
+"""Офлайн-прогон загрузки и рассылки: фейковый HH, фейковый бот и БД в памяти.
+
+Меряет задержку (p50/p99) и пропускную способность каждой стадии — поиск ID,
+загрузка карточек, разбор, модели, запись, отправка — и сравнивает с сохранённым
+базовым прогоном; при регрессии завершается с кодом 1.
+
+    python -m bench.replay --users 200 --vacancies 300
+    python -m bench.replay --update-baseline     # записать bench/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from bench.fake_hh import FakeHH
+from bench.fakes import FakeBot, MemoryDatabase
+from bench.stats import print_table, summary
+from config.config import HHConfig, MlConfig, NotifierConfig, PipelineConfig
+from services.notifier import VacancyNotifier
+from services.processing import VacancyProcessor
+from services.profiles import SearchProfile
+from services.sender import MessageSender
+import services.hh_parser as hh_parser
+import services.ingest as ingest
+
+BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+
+# пользователи получают разные подборки из одного поиска: фильтры профиля применяются в памяти
+PROFILES = [SearchProfile(), SearchProfile(grade='Middle'), SearchProfile(min_salary=150_000)]
+
+# меньше вызовов — p99 стадии в сравнении с базой не участвует
+MIN_P99_CALLS = 100
+
+# параметры, от которых зависят цифры: сравнивать можно только прогоны с одинаковыми
+SCENARIO_ARGS = ['users', 'vacancies', 'hh_latency', 'bot_latency', 'db_latency', 'executor',
+                 'workers', 'batch_size', 'fetch_workers']
+
+
+class StageTimer:
+    """Длительности вызовов по стадиям и окно [первый старт, последний финиш] для пропускной способности."""
+
+    def __init__(self):
+        self.durations: dict[str, list[float]] = {}
+        self.items: dict[str, int] = {}
+        self.window: dict[str, tuple[float, float]] = {}
+
+    def wrap(self, name: str, func, count=lambda args, result: 1):
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            result = await func(*args, **kwargs)
+            finished = time.perf_counter()
+            self.durations.setdefault(name, []).append(finished - started)
+            self.items[name] = self.items.get(name, 0) + count(args, result)
+            first, last = self.window.get(name, (started, finished))
+            self.window[name] = (min(first, started), max(last, finished))
+            return result
+        return timed
+
+    def report(self) -> dict[str, dict]:
+        report = {}
+        for name, durations in self.durations.items():
+            first, last = self.window[name]
+            report[name] = {
+                'calls': len(durations),
+                'items': self.items[name],
+                'per_second': self.items[name] / max(last - first, 1e-9),
+                **summary(durations),
+            }
+        return report
+
+
+async def replay(args) -> dict[str, dict]:
+    timer = StageTimer()
+    server = FakeHH(args.vacancies, args.hh_latency)
+    hh_parser.HH_API_URL = await server.start()
+    ingest.fetch_hh_ids = timer.wrap('fetch_hh_ids', hh_parser.fetch_hh_ids,
+                                     lambda args, result: len(result))
+
+    db = MemoryDatabase(args.db_latency)
+    db.add_users(args.users, PROFILES)
+    db.insert_vacancies_bulk = timer.wrap('insert', db.insert_vacancies_bulk,
+                                          lambda args, result: len(args[0]))
+
+    hh = hh_parser.HHClient(HHConfig(
+        concurrency=args.fetch_workers, rate_limit=1000.0, max_retries=3, ingest_interval=0,
+        cache_size=args.vacancies, cache_dir=None, search_cache_ttl=0, vacancy_cache_ttl=0,
+        cache_disk_max_entries=0))
+    processor = VacancyProcessor(MlConfig(
+        batch_size=args.batch_size, executor=args.executor, workers=args.workers,
+        prediction_store=False, preload=True, grade_model='grade_model_new',
+        salary_model='salary_model_new', shadow_grade_model=None, shadow_salary_model=None,
+        reload_interval=0, selection_file=None))
+    # прогрев моделей не входит в замер стадий
+    await processor.warm_up()
+    processor.extract = timer.wrap('extract', processor.extract, lambda args, result: len(args[0]))
+    processor.predict = timer.wrap('predict', processor.predict, lambda args, result: len(args[0]))
+
+    ingestor = ingest.VacancyIngestor(db, hh, processor, interval=0, batch_size=args.batch_size,
+                                      config=PipelineConfig(args.fetch_workers, 2, 2, 4, 0.05))
+    ingestor._fetch = timer.wrap('fetch_vacancy', ingestor._fetch)
+
+    bot = FakeBot(args.bot_latency)
+    notifier_config = NotifierConfig(max_parallel=30, send_workers=30, global_rate=args.send_rate,
+                                     chat_rate=args.send_rate, vacancies_per_message=5,
+                                     lease_seconds=300.0, claim_batch=100, resync_interval=0)
+    sender = MessageSender(bot, notifier_config.send_workers, notifier_config.global_rate,
+                           notifier_config.chat_rate)
+    sender.start()
+    notifier = VacancyNotifier(bot, db, sender, notifier_config, owner='replay')
+    notifier.send_vacancies = timer.wrap('send_vacancies', notifier.send_vacancies,
+                                         lambda args, result: len(args[1]))
+
+    try:
+        started = time.perf_counter()
+        ingested = await ingestor.run_once()
+        ingest_seconds = time.perf_counter() - started
+        if ingested.inserted != args.vacancies:
+            raise RuntimeError(f"Сохранено {ingested.inserted} вакансий из {args.vacancies}")
+
+        started = time.perf_counter()
+        await notifier.notify_users(list(db.users))
+        notify_seconds = time.perf_counter() - started
+        stale = [user['chat_id'] for user in db.users.values() if not user['last_seq']]
+        if stale:
+            raise RuntimeError(f"Курсор не сдвинулся у {len(stale)} пользователей")
+    finally:
+        await sender.close()
+        await hh.close()
+        processor.shutdown()
+        await server.close()
+
+    report = timer.report()
+    report['ingest_total'] = {'calls': 1, 'items': ingested.inserted, 'per_second': ingested.inserted / ingest_seconds,
+                              **summary([ingest_seconds])}
+    report['notify_total'] = {'calls': 1, 'items': len(bot.sent), 'per_second': len(bot.sent) / notify_seconds,
+                              **summary([notify_seconds])}
+    return report
+
+
+def median_report(reports: list[dict[str, dict]]) -> dict[str, dict]:
+    """Медиана каждой метрики по прогонам: одиночный прогон на общей машине слишком шумный."""
+    return {
+        stage: {metric: statistics.median(report[stage][metric] for report in reports)
+                for metric in values}
+        for stage, values in reports[0].items()
+    }
+
+
+def compare(report: dict[str, dict], baseline: dict[str, dict], tolerance: float, slack_ms: float) -> list[str]:
+    """Регрессии относительно базового прогона: задержка выше или пропускная способность ниже допуска."""
+    regressions = []
+    for stage, base in baseline.items():
+        current = report.get(stage)
+        if current is None:
+            regressions.append(f"{stage}: стадия пропала из прогона")
+            continue
+        # на малом числе вызовов p99 — это просто максимум, он слишком шумный для проверки
+        metrics = ['p50_ms', 'p99_ms'] if base['calls'] >= MIN_P99_CALLS else ['p50_ms']
+        for metric in metrics:
+            if current[metric] > base[metric] * (1 + tolerance) + slack_ms:
+                regressions.append(f"{stage}: {metric} {current[metric]:.1f}, база {base[metric]:.1f}")
+        if current['per_second'] < base['per_second'] * (1 - tolerance):
+            regressions.append(f"{stage}: {current['per_second']:.1f}/с, база {base['per_second']:.1f}/с")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--vacancies', type=int, default=300)
+    parser.add_argument('--hh-latency', type=float, default=0.02, help='задержка ответа HH, сек')
+    parser.add_argument('--bot-latency', type=float, default=0.005, help='задержка send_message, сек')
+    parser.add_argument('--db-latency', type=float, default=0.001, help='задержка запроса к БД, сек')
+    parser.add_argument('--send-rate', type=float, default=10_000.0,
+                        help='лимит отправки, сообщений в секунду (в Telegram ~30 на бота и 1 на чат)')
+    parser.add_argument('--executor', default='process', choices=['process', 'thread'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--fetch-workers', type=int, default=10)
+    parser.add_argument('--runs', type=int, default=3, help='прогонов, по которым берётся медиана')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help='записать результат как базовый')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='допустимое ухудшение, доля')
+    parser.add_argument('--slack-ms', type=float, default=2.0, help='разница p99, которую считаем шумом, мс')
+    args = parser.parse_args()
+
+    report = median_report([asyncio.run(replay(args)) for _ in range(args.runs)])
+    print_table([{'stage': stage, **values} for stage, values in report.items()],
+                ['stage', 'calls', 'items', 'per_second', 'p50_ms', 'p99_ms', 'mean_ms'])
+
+    scenario = {name: getattr(args, name) for name in SCENARIO_ARGS}
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps({'scenario': scenario, 'stages': report},
+                                            indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        print(f"Базовый прогон записан в {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"Базового прогона {args.baseline} нет, сравнение пропущено")
+        return
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    if baseline['scenario'] != scenario:
+        print(f"Сценарий отличается от базового {baseline['scenario']}, сравнение пропущено")
+        return
+    regressions = compare(report, baseline['stages'], args.tolerance, args.slack_ms)
+    for regression in regressions:
+        print(f"РЕГРЕССИЯ {regression}")
+    if regressions:
+        sys.exit(1)
+    print("Регрессий относительно базового прогона нет")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -0,0 +1,32 @@
+"""Общие мелочи для бенчмарков: перцентили и печать результатов."""
+import statistics
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summary(values: list[float]) -> dict[str, float]:
+    """p50/p99/среднее в миллисекундах для списка длительностей в секундах."""
+    return {
+        'p50_ms': percentile(values, 50) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+        'mean_ms': statistics.fmean(values) * 1000 if values else 0.0,
+    }
+
+
+def print_table(rows: list[dict], columns: list[str]):
+    widths = {column: max(len(column), *(len(_format(row.get(column))) for row in rows)) for column in columns}
+    print('  '.join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print('  '.join(_format(row.get(column)).ljust(widths[column]) for column in columns))
+
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return f'{value:.3f}'
+    return '' if value is None else str(value)
@@ -1,5 +1,7 @@
 from dataclasses import dataclass
 from environs import Env
+import os
+import socket
 
 
 @dataclass
@@ -13,12 +15,105 @@ class DatabaseConfig:
     db_user: str          # Username пользователя базы данных
     db_password: str      # Пароль к базе данных
     db_port: str          # Порт для подключения к базе данных
+    ssl: str              # Режим SSL: disable, prefer, require, verify-ca, verify-full
+    pool_min_size: int    # Соединений в пуле минимум
+    pool_max_size: int    # Соединений в пуле максимум
+    statement_cache_size: int  # Подготовленных запросов на соединение (0 — не подготавливать)
+    command_timeout: float | None  # Таймаут одного запроса, сек
+    retries: int          # Повторов запроса после обрыва соединения
+    breaker_threshold: int  # Сбоев подряд, после которых база считается недоступной
+    breaker_timeout: float  # Сколько секунд после этого отклонять запросы сразу
+
+@dataclass
+class HHConfig:
+    concurrency: int      # Максимум одновременных запросов к api.hh.ru
+    rate_limit: float     # Запросов в секунду к одному хосту
+    max_retries: int      # Число повторов при 429/5xx
+    ingest_interval: int  # Период загрузки новых вакансий с HH, сек
+    cache_size: int       # Сколько ответов HH держать в памяти
+    cache_dir: str | None # Каталог дискового кэша ответов HH (None — только память)
+    search_cache_ttl: int # Время жизни страниц поиска в кэше, сек
+    vacancy_cache_ttl: int  # Время жизни карточек вакансий в кэше, сек
+    cache_disk_max_entries: int  # Максимум файлов в дисковом кэше
+
+@dataclass
+class MlConfig:
+    batch_size: int       # Размер батча вакансий для одного вызова моделей
+    executor: str         # Где считать модели: 'process' или 'thread'
+    workers: int | None   # Число воркеров (None — по числу ядер)
+    prediction_store: bool  # Хранить предсказания по отпечатку признаков в Postgres
+    preload: bool         # Загружать модели в фоне на старте, до запуска воркеров
+    grade_model: str      # Активная модель грейда (имя файла в models/ без .cbm)
+    salary_model: str     # Активная модель зарплаты
+    shadow_grade_model: str | None   # Кандидат, который считается в тени рядом с активной моделью
+    shadow_salary_model: str | None
+    reload_interval: int  # Как часто проверять файлы моделей на замену, сек (0 — не проверять)
+    selection_file: str | None  # JSON с выбором моделей поверх переменных окружения
+
+
+@dataclass
+class StorageConfig:
+    retention_days: int   # Сколько дней хранить вакансии в vacancies_hh (0 — бессрочно)
+    archive: bool         # Переносить устаревшие вакансии в vacancies_hh_archive, а не удалять
+    interval: int         # Период обслуживания хранилища, сек
+    batch_size: int       # Строк за один запрос переноса или удаления
+
+
+@dataclass
+class PipelineConfig:
+    fetch_workers: int    # Параллельных загрузок карточек вакансий с HH
+    extract_workers: int  # Батчей одновременно на разборе HTML
+    score_workers: int    # Батчей одновременно на моделях
+    queue_size: int       # Ёмкость очереди между стадиями, в батчах
+    linger: float         # Сколько ждать до неполного батча перед отправкой на разбор, сек
+
+
+@dataclass
+class NotifierConfig:
+    max_parallel: int     # Сколько пользователей обрабатывать одновременно
+    send_workers: int     # Число воркеров отправки сообщений
+    global_rate: float    # Лимит сообщений в секунду на весь бот
+    chat_rate: float      # Лимит сообщений в секунду в один чат
+    vacancies_per_message: int  # Сколько вакансий упаковывать в одно сообщение
+    lease_seconds: float  # На сколько экземпляр берёт пользователей в работу (аренда в users)
+    claim_batch: int      # Сколько пользователей брать в работу за раз
+    resync_interval: int  # Как часто сверять расписание с таблицей users, сек (0 — не сверять)
+
+
+@dataclass
+class MonitoringConfig:
+    log_level: str        # Уровень логов (DEBUG, INFO, WARNING, ...)
+    metrics_host: str     # Адрес HTTP-эндпоинта метрик Prometheus
+    metrics_port: int | None  # Порт эндпоинта метрик (None — не поднимать)
+
+
+@dataclass
+class InstanceConfig:
+    roles: set[str]       # Что запускать в этом процессе: bot, ingest, notifier
+    instance_id: str      # Имя экземпляра в арендах пользователей
+
+
+@dataclass
+class WebhookConfig:
+    url: str | None       # Публичный адрес вебхука (None — long polling)
+    path: str             # Путь, на который Telegram присылает апдейты
+    host: str             # Адрес, на котором слушает aiohttp
+    port: int             # Порт aiohttp
+    secret: str | None    # Секрет для заголовка X-Telegram-Bot-Api-Secret-Token
 
 
 @dataclass
 class Config:
     tg_bot: TgBot
     db: DatabaseConfig
+    hh: HHConfig
+    ml: MlConfig
+    storage: StorageConfig
+    pipeline: PipelineConfig
+    notifier: NotifierConfig
+    monitoring: MonitoringConfig
+    instance: InstanceConfig
+    webhook: WebhookConfig
 
 
 def load_config(path: str | None = None) -> Config:
@@ -32,7 +127,78 @@ def load_config(path: str | None = None) -> Config:
             db_host=env('DB_HOST'),
             db_user=env('DB_USER'),
             db_password=env('DB_PASSWORD'),
-            db_port=env('DB_PORT')
+            db_port=env('DB_PORT'),
+            ssl=env('DB_SSL', 'require'),
+            pool_min_size=env.int('DB_POOL_MIN_SIZE', 5),
+            pool_max_size=env.int('DB_POOL_MAX_SIZE', 10),
+            statement_cache_size=env.int('DB_STATEMENT_CACHE_SIZE', 100),
+            command_timeout=env.float('DB_COMMAND_TIMEOUT', 60.0),
+            retries=env.int('DB_RETRIES', 2),
+            breaker_threshold=env.int('DB_BREAKER_THRESHOLD', 5),
+            breaker_timeout=env.float('DB_BREAKER_TIMEOUT', 30.0)
+        ),
+        hh=HHConfig(
+            concurrency=env.int('HH_CONCURRENCY', 10),
+            rate_limit=env.float('HH_RATE_LIMIT', 10.0),
+            max_retries=env.int('HH_MAX_RETRIES', 3),
+            ingest_interval=env.int('HH_INGEST_INTERVAL', 300),
+            cache_size=env.int('HH_CACHE_SIZE', 2000),
+            cache_dir=env('HH_CACHE_DIR', None),
+            search_cache_ttl=env.int('HH_SEARCH_CACHE_TTL', 60),
+            vacancy_cache_ttl=env.int('HH_VACANCY_CACHE_TTL', 3600),
+            cache_disk_max_entries=env.int('HH_CACHE_DIR_MAX_ENTRIES', 10000)
+        ),
+        ml=MlConfig(
+            batch_size=env.int('ML_BATCH_SIZE', 32),
+            executor=env('ML_EXECUTOR', 'process'),
+            workers=env.int('ML_WORKERS', None),
+            prediction_store=env.bool('ML_PREDICTION_STORE', False),
+            preload=env.bool('ML_PRELOAD', True),
+            grade_model=env('ML_GRADE_MODEL', 'grade_model_new'),
+            salary_model=env('ML_SALARY_MODEL', 'salary_model_new'),
+            shadow_grade_model=env('ML_SHADOW_GRADE_MODEL', None),
+            shadow_salary_model=env('ML_SHADOW_SALARY_MODEL', None),
+            reload_interval=env.int('ML_RELOAD_INTERVAL', 60),
+            selection_file=env('ML_SELECTION_FILE', 'models/active.json')
+        ),
+        storage=StorageConfig(
+            retention_days=env.int('VACANCY_RETENTION_DAYS', 0),
+            archive=env.bool('VACANCY_ARCHIVE', True),
+            interval=env.int('STORAGE_MAINTENANCE_INTERVAL', 3600),
+            batch_size=env.int('STORAGE_BATCH_SIZE', 5000)
+        ),
+        pipeline=PipelineConfig(
+            fetch_workers=env.int('PIPELINE_FETCH_WORKERS', 10),
+            extract_workers=env.int('PIPELINE_EXTRACT_WORKERS', 2),
+            score_workers=env.int('PIPELINE_SCORE_WORKERS', 2),
+            queue_size=env.int('PIPELINE_QUEUE_SIZE', 4),
+            linger=env.float('PIPELINE_LINGER', 1.0)
+        ),
+        notifier=NotifierConfig(
+            max_parallel=env.int('NOTIFY_MAX_PARALLEL', 30),
+            send_workers=env.int('SEND_WORKERS', 30),
+            global_rate=env.float('SEND_GLOBAL_RATE', 25.0),
+            chat_rate=env.float('SEND_CHAT_RATE', 1.0),
+            vacancies_per_message=env.int('SEND_VACANCIES_PER_MESSAGE', 5),
+            lease_seconds=env.float('NOTIFY_LEASE_SECONDS', 300.0),
+            claim_batch=env.int('NOTIFY_CLAIM_BATCH', 100),
+            resync_interval=env.int('NOTIFY_RESYNC_INTERVAL', 0)
+        ),
+        monitoring=MonitoringConfig(
+            log_level=env('LOG_LEVEL', 'INFO'),
+            metrics_host=env('METRICS_HOST', '127.0.0.1'),
+            metrics_port=env.int('METRICS_PORT', None)
+        ),
+        instance=InstanceConfig(
+            roles=set(env.list('ROLES', ['bot', 'ingest', 'notifier'])),
+            instance_id=env('INSTANCE_ID', f'{socket.gethostname()}:{os.getpid()}')
+        ),
+        webhook=WebhookConfig(
+            url=env('WEBHOOK_URL', None),
+            path=env('WEBHOOK_PATH', '/webhook'),
+            host=env('WEBHOOK_HOST', '0.0.0.0'),
+            port=env.int('WEBHOOK_PORT', 8080),
+            secret=env('WEBHOOK_SECRET', None)
         )
     )
     
\ No newline at end of file
@@ -1,32 +1,210 @@
 import asyncpg
 from config.config import DatabaseConfig
-from database.queries import GET_EXISTING_IDS, INSERT_VACANCY
+from database.queries import (GET_EXISTING_IDS, INSERT_VACANCY, VACANCY_COLUMNS,
+                              CREATE_VACANCIES_STAGE, MERGE_VACANCIES_STAGE,
+                              CREATE_VACANCY_INDEXES, GET_VACANCIES_AFTER, GET_MAX_INGEST_SEQ,
+                              INSERT_VACANCY_QUERIES, GET_SEARCH_QUERIES, UPDATE_USER_PROFILE,
+                              USER_COLUMNS, UPDATE_USERS_STATE, CLAIM_USERS, RENEW_LEASES,
+                              NOTIFY_USERS_CHANGED,
+                              GET_RECENT_VACANCIES, CREATE_VACANCY_STORAGE, MOVE_DESCRIPTIONS,
+                              DELETE_EXPIRED_VACANCIES, ARCHIVE_EXPIRED_VACANCIES,
+                              CREATE_ML_PREDICTIONS, GET_ML_PREDICTIONS, UPSERT_ML_PREDICTIONS)
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta, timezone
+from functools import wraps
+from services.circuit_breaker import CircuitBreaker
+from services.metrics import DB_CIRCUIT_OPEN, DB_CONNECTION_ERRORS, DB_QUERY_SECONDS
+from services.profiles import SearchProfile
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+# ошибки, после которых запрос можно повторить на другом соединении пула
+CONNECTION_ERRORS = (
+    asyncpg.PostgresConnectionError,   # в т.ч. ConnectionDoesNotExistError — обрыв посреди запроса
+    asyncpg.CannotConnectNowError,     # сервер стартует или восстанавливается
+    asyncpg.AdminShutdownError,
+    OSError,                           # сеть и ConnectTimeoutError
+)
+
+
+class ConnectTimeoutError(ConnectionError):
+    """Не удалось открыть соединение пула за отведённое время; запрос можно повторить."""
+
+
+# соединение, закреплённое за батчем через Database.connection(): (база, соединение, замок)
+_bound_connection: ContextVar[tuple | None] = ContextVar('db_bound_connection', default=None)
+
+
+def _connection_lost(conn, error: Exception) -> bool:
+    """Ошибка запроса означает, что соединение потеряно и на нём уже ничего не выполнить."""
+    # обрыв внутри транзакции всплывает как InterfaceError из её __aexit__, причина — в __context__
+    if isinstance(error, CONNECTION_ERRORS) or isinstance(error.__context__, CONNECTION_ERRORS):
+        return True
+    return _is_closed(conn)
+
+
+def _is_closed(conn) -> bool:
+    try:
+        return conn.is_closed()
+    except asyncpg.InterfaceError:
+        # пул уже отвязал закрытое соединение от прокси
+        return True
+
+
+def _query(name: str):
+    """Метрика времени и повтор после обрыва соединения для метода Database."""
+    def decorator(method):
+        @DB_QUERY_SECONDS.timed(query=name)
+        @wraps(method)
+        async def wrapper(self: 'Database', *args, **kwargs):
+            return await self.run(name, method, self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 class Database:
     def __init__(self, config: DatabaseConfig):
         self.config = config
         self.pool: asyncpg.Pool 
+        self.breaker = CircuitBreaker('База данных', config.breaker_threshold, config.breaker_timeout)
+        DB_CIRCUIT_OPEN.set_function(lambda: [({}, int(self.breaker.is_open))])
 
-    async def connect(self):
-        self.pool = await asyncpg.create_pool(
+    def _connect_options(self) -> dict:
+        return dict(
             user=self.config.db_user,
             password=self.config.db_password,
             host=self.config.db_host,
             database=self.config.database,
             port=self.config.db_port,
-            # добавление для нелокальной базы
-            ssl="require",
-            statement_cache_size=0,
-            min_size=5,
-            max_size=10,
+            ssl=self.config.ssl,
+            # при кэше больше 0 каждый запрос готовится сервером один раз на соединение;
+            # за пулером в режиме транзакций подготовленные запросы не работают — там 0
+            statement_cache_size=self.config.statement_cache_size,
+            command_timeout=self.config.command_timeout,
         )
-    
-    async def create_users_table(self):
+
+    async def connect(self):
+        self.pool = await asyncpg.create_pool(
+            **self._connect_options(),
+            min_size=self.config.pool_min_size,
+            max_size=self.config.pool_max_size,
+        )
+
+    @asynccontextmanager
+    async def listen(self, channel: str, callback):
+        """LISTEN channel на отдельном соединении вне пула; callback(payload) на каждое уведомление.
+
+        Отдаёт событие, которое выставляется, когда соединение потеряно: уведомления,
+        пришедшие до переподключения, не доставляются.
+        """
+        conn = await asyncpg.connect(**self._connect_options())
+        closed = asyncio.Event()
+        conn.add_termination_listener(lambda _: closed.set())
+        try:
+            await conn.add_listener(channel, lambda _conn, _pid, _channel, payload: callback(payload))
+            yield closed
+        finally:
+            if not conn.is_closed():
+                await conn.close()
+
+    async def run(self, name: str, func, *args, **kwargs):
+        """Выполняет запрос; после обрыва соединения повторяет его на новом соединении пула.
+
+        Пул сам заменяет закрытые соединения при следующем acquire, поэтому повтор
+        и есть переподключение. Внутри connection() соединение батча не подменить —
+        там ошибка пробрасывается сразу.
+        """
+        attempts = 1 if _bound_connection.get() is not None else self.config.retries + 1
+        for attempt in range(1, attempts + 1):
+            self.breaker.check()
+            try:
+                result = await func(*args, **kwargs)
+            except TimeoutError:
+                # command_timeout: запрос дошёл до базы и не уложился — повтор нагрузит её ещё раз,
+                # и это не признак недоступности. Таймаут подключения приходит как ConnectTimeoutError
+                raise
+            except CONNECTION_ERRORS as e:
+                self.breaker.record_failure()
+                DB_CONNECTION_ERRORS.inc(query=name)
+                if attempt == attempts:
+                    raise
+                logger.warning(f"[DB] {name}: соединение потеряно ({type(e).__name__}: {e}), "
+                               f"повтор {attempt} из {attempts - 1}")
+                await asyncio.sleep(0.5 * attempt)
+            except Exception:
+                # база ответила — с соединением всё в порядке, ошибка в самом запросе
+                self.breaker.record_success()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Соединение для одного запроса: закреплённое за батчем или из пула."""
+        bound = _bound_connection.get()
+        if bound is not None and bound[0] is self:
+            # задачи, запущенные внутри connection(), делят одно соединение по очереди
+            async with bound[2]:
+                yield bound[1]
+            return
+        holder, conn = await self._acquire_from_pool()
+        try:
+            yield conn
+        finally:
+            await holder.__aexit__(None, None, None)
+
+    async def _acquire_from_pool(self):
+        """Вход в pool.acquire(); таймаут открытия соединения отличаем от таймаута запроса."""
+        holder = self.pool.acquire()
+        try:
+            return holder, await holder.__aenter__()
+        except TimeoutError as e:
+            raise ConnectTimeoutError(f"таймаут подключения к базе: {e!r}") from e
+
+    @asynccontextmanager
+    async def connection(self):
+        """Одно соединение на весь батч: методы Database внутри блока не ходят в пул.
+
+        Соединение держится до конца блока, поэтому внутри не стоит ждать сеть
+        (HH, Telegram) — это занимает соединение пула впустую.
+        """
+        bound = _bound_connection.get()
+        if bound is not None and bound[0] is self:
+            yield bound[1]
+            return
+        self.breaker.check()
+        try:
+            holder, conn = await self._acquire_from_pool()
+        except CONNECTION_ERRORS:
+            self.breaker.record_failure()
+            DB_CONNECTION_ERRORS.inc(query='acquire')
+            raise
+        token = _bound_connection.set((self, conn, asyncio.Lock()))
+        try:
+            yield conn
+        finally:
+            _bound_connection.reset(token)
+            await holder.__aexit__(None, None, None)
+
+    @asynccontextmanager
+    async def advisory_lock(self, key: int):
+        """Сессионная advisory-блокировка на время блока; False — её держит другой экземпляр."""
+        self.breaker.check()
         async with self.pool.acquire() as conn:
+            locked = await conn.fetchval('SELECT pg_try_advisory_lock($1)', key)
+            try:
+                yield locked
+            finally:
+                # если соединение оборвалось, сервер уже снял блокировку сам
+                if locked and not _is_closed(conn):
+                    await conn.execute('SELECT pg_advisory_unlock($1)', key)
+
+    async def create_users_table(self):
+        async with self.acquire() as conn:
             await conn.execute('''
                 CREATE TABLE IF NOT EXISTS users (
                 chat_id BIGINT PRIMARY KEY,
@@ -34,110 +212,266 @@ class Database:
                 last_check TIMESTAMP DEFAULT NOW()
                 )
             ''')
+            await conn.execute('''
+                ALTER TABLE users
+                ADD COLUMN IF NOT EXISTS last_seq BIGINT,
+                ADD COLUMN IF NOT EXISTS area TEXT,
+                ADD COLUMN IF NOT EXISTS roles INT[],
+                ADD COLUMN IF NOT EXISTS grade TEXT,
+                ADD COLUMN IF NOT EXISTS min_salary INT,
+                ADD COLUMN IF NOT EXISTS lease_owner TEXT,
+                ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ
+            ''')
+
+    async def create_vacancy_indexes(self):
+        async with self.acquire() as conn:
+            await conn.execute(CREATE_VACANCY_INDEXES)
+            # пользователи без курсора начинают с текущего конца таблицы
+            await conn.execute(
+                f'UPDATE users SET last_seq = ({GET_MAX_INGEST_SEQ}) WHERE last_seq IS NULL'
+            )
 
     
+    @_query('update_user_settings')
     async def update_user_settings(self, chat_id: int, interval: int):
-        async with self.pool.acquire() as conn:
-            await conn.execute('''
-                INSERT INTO users (chat_id, update_interval)
-                VALUES ($1, $2)
+        async with self.acquire() as conn:
+            user = await conn.fetchrow(f'''
+                INSERT INTO users (chat_id, update_interval, last_seq)
+                VALUES ($1, $2, ({GET_MAX_INGEST_SEQ}))
                 ON CONFLICT (chat_id) DO UPDATE
                 SET update_interval = EXCLUDED.update_interval
+                RETURNING chat_id, update_interval, last_check
             ''', chat_id, interval)
+            await conn.execute(NOTIFY_USERS_CHANGED, str(chat_id))
+            return user
 
 
+    @_query('get_all_users')
     async def get_all_users(self):
-        async with self.pool.acquire() as conn:
-            return await conn.fetch('SELECT * FROM users')
-        
-    
-    async def get_new_vacancies(self, last_check: datetime):
-        async with self.pool.acquire() as conn:
-            return await conn.fetch(
-                'SELECT * FROM vacancies_hh WHERE published_at > $1',
-                last_check
+        async with self.acquire() as conn:
+            return await conn.fetch('SELECT chat_id, update_interval, last_check FROM users')
+
+    @_query('claim_users')
+    async def claim_users(self, chat_ids: list[int], owner: str, lease_seconds: float):
+        """Берёт пользователей в работу; возвращает только тех, кого не держит другой экземпляр."""
+        async with self.acquire() as conn:
+            return await conn.fetch(CLAIM_USERS, chat_ids, owner, lease_seconds)
+
+    @_query('renew_leases')
+    async def renew_leases(self, chat_ids: list[int], owner: str, lease_seconds: float):
+        """Продлевает аренду owner на пользователей, которых он ещё рассылает."""
+        async with self.acquire() as conn:
+            await conn.execute(RENEW_LEASES, chat_ids, owner, lease_seconds)
+
+    @_query('update_users_state')
+    async def update_users_state(self, states: dict[int, tuple[datetime, int | None]],
+                                 owner: str | None = None):
+        """Время проверки и курсор рассылки для многих пользователей одним UPDATE.
+
+        Заодно снимает аренды owner с этих пользователей.
+        """
+        if not states:
+            return
+        async with self.acquire() as conn:
+            await conn.execute(
+                UPDATE_USERS_STATE,
+                list(states),
+                [last_check for last_check, _ in states.values()],
+                [last_seq for _, last_seq in states.values()],
+                owner,
+            )
+
+    @_query('get_vacancies_after')
+    async def get_vacancies_after(self, last_seq: int, limit: int = 200):
+        async with self.acquire() as conn:
+            return await conn.fetch(GET_VACANCIES_AFTER, last_seq, limit)
+
+    @_query('get_search_profiles')
+    async def get_search_profiles(self) -> list[SearchProfile]:
+        async with self.acquire() as conn:
+            records = await conn.fetch(GET_SEARCH_QUERIES)
+            return [SearchProfile.from_user(r) for r in records]
+
+    @_query('update_user_profile')
+    async def update_user_profile(self, chat_id: int, profile: SearchProfile):
+        async with self.acquire() as conn:
+            return await conn.fetchrow(
+                UPDATE_USER_PROFILE,
+                chat_id,
+                profile.area,
+                list(profile.roles) if profile.roles else None,
+                profile.grade,
+                profile.min_salary,
+            )
+
+    @_query('insert_vacancy_queries')
+    async def insert_vacancy_queries(self, matches: list[tuple[str, str]]):
+        if not matches:
+            return
+        async with self.acquire() as conn:
+            await conn.execute(
+                INSERT_VACANCY_QUERIES,
+                [int(vac_id) for vac_id, _ in matches],
+                [query_key for _, query_key in matches],
+            )
+
+    async def create_storage_tables(self):
+        async with self.acquire() as conn:
+            await conn.execute(CREATE_VACANCY_STORAGE)
+
+    @_query('move_descriptions')
+    async def move_descriptions(self, batch_size: int) -> int:
+        """Переносит порцию описаний из vacancies_hh в vacancy_descriptions, возвращает их число."""
+        async with self.acquire() as conn:
+            return await conn.fetchval(MOVE_DESCRIPTIONS, batch_size)
+
+    @_query('expire_vacancies')
+    async def expire_vacancies(self, published_before: datetime, batch_size: int, archive: bool) -> int:
+        """Удаляет (или переносит в архив) порцию вакансий, опубликованных до published_before."""
+        async with self.acquire() as conn:
+            return await conn.fetchval(
+                ARCHIVE_EXPIRED_VACANCIES if archive else DELETE_EXPIRED_VACANCIES,
+                published_before,
+                batch_size,
+            )
+
+    async def create_predictions_table(self):
+        async with self.acquire() as conn:
+            await conn.execute(CREATE_ML_PREDICTIONS)
+
+    @_query('get_predictions')
+    async def get_predictions(self, version: str, fingerprints: list[str]) -> dict[str, tuple]:
+        async with self.acquire() as conn:
+            records = await conn.fetch(GET_ML_PREDICTIONS, version, fingerprints)
+            return {r['fingerprint']: (r['grade'], r['predicted_salary']) for r in records}
+
+    @_query('save_predictions')
+    async def save_predictions(self, version: str, predictions: dict[str, tuple]):
+        if not predictions:
+            return
+        async with self.acquire() as conn:
+            await conn.execute(
+                UPSERT_ML_PREDICTIONS,
+                version,
+                list(predictions),
+                [grade for grade, _ in predictions.values()],
+                [salary for _, salary in predictions.values()],
             )
 
 
+    @_query('get_recent_vacancies')
     async def get_recent_vacancies(self, limit: int = 10) -> list[asyncpg.Record]:
         if not self.pool:
             raise ConnectionError("Database connection not established.")
 
-        async with self.pool.acquire() as conn:
-            query = """
-            SELECT * 
-            FROM vacancies_hh 
-            ORDER BY published_at 
-            DESC LIMIT $1
-            """
-            return await conn.fetch(query, limit)
-    
-    async def get_existing_ids(self) -> set:
-        async with self.pool.acquire() as conn:
-            records = await conn.fetch(GET_EXISTING_IDS)
-            return {r['id'] for r in records}
+        async with self.acquire() as conn:
+            return await conn.fetch(GET_RECENT_VACANCIES, limit)
+
+    @_query('get_existing_ids')
+    async def get_existing_ids(self, ids: list[str]) -> set[str]:
+        # проверяем только переданные ID по первичному ключу, без скана всей таблицы
+        async with self.acquire() as conn:
+            records = await conn.fetch(GET_EXISTING_IDS, [int(vac_id) for vac_id in ids])
+            return {str(r['id']) for r in records}
         
+    @_query('get_last_published_time')
     async def get_last_published_time(self):
-        async with self.pool.acquire() as conn:
-            try:
-                last_time = await conn.fetchval(
-                    'SELECT MAX(published_at) FROM vacancies_hh'
-                )
-                if last_time is None:
-                    return datetime.now(timezone.utc)
-                if last_time.tzinfo is None:
-                    last_time = last_time.replace(tzinfo=timezone.utc)
-                return last_time 
-            
-            except Exception as e:
-                logger.error(f"Error fetching last published time: {e}")
-                return datetime.now(timezone.utc)
-                
-        
-    async def insert_vacancy(self, vacancy: dict):
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                    INSERT_VACANCY, 
-                    int(vacancy['id']),
-                    vacancy['vacancy_name'],
-                    vacancy.get('schedule'),
-                    vacancy.get('experience'),
-                    vacancy.get('city'),
-                    vacancy.get('employer'),
-                    vacancy.get('salary_from'),
-                    vacancy.get('salary_to'),
-                    vacancy.get('type'),
-                    vacancy.get('url'),
-                    vacancy.get('key_skills', ''),
-                    vacancy.get('professional_role', ''),
-                    vacancy.get('description'),
-                    vacancy.get('published_at'),
-                    vacancy.get('experience_cat', 1),
-                    vacancy.get('grade', 'Не указано'),
-                    vacancy.get('predicted_salary', None),
+        # ошибки не глушим: иначе загрузка тихо начнёт окно с «сейчас» и пропустит вакансии,
+        # а повтор и размыкание цепи в run() не сработают
+        async with self.acquire() as conn:
+            last_time = await conn.fetchval(
+                'SELECT MAX(published_at) FROM vacancies_hh'
             )
+            if last_time is None:
+                return datetime.now(timezone.utc)
+            if last_time.tzinfo is None:
+                last_time = last_time.replace(tzinfo=timezone.utc)
+            return last_time
+
+    @staticmethod
+    def _vacancy_record(vacancy: dict) -> tuple:
+        predicted_salary = vacancy.get('predicted_salary', None)
+        return (
+            int(vacancy['id']),
+            vacancy['vacancy_name'],
+            vacancy.get('schedule'),
+            vacancy.get('experience'),
+            vacancy.get('city'),
+            vacancy.get('employer'),
+            vacancy.get('salary_from'),
+            vacancy.get('salary_to'),
+            vacancy.get('type'),
+            vacancy.get('url'),
+            vacancy.get('key_skills', ''),
+            vacancy.get('professional_role', ''),
+            vacancy.get('description'),
+            vacancy.get('published_at'),
+            vacancy.get('experience_cat', 1),
+            vacancy.get('grade', 'Не указано'),
+            int(predicted_salary) if predicted_salary is not None else None,
+            vacancy.get('card'),
+        )
+
+    @_query('insert_vacancies_bulk')
+    async def insert_vacancies_bulk(self, vacancies: list[dict]) -> set[str]:
+        """Сохраняет пачку вакансий за одну транзакцию, возвращает ID реально добавленных."""
+        if not vacancies:
+            return set()
+
+        records = [self._vacancy_record(vacancy) for vacancy in vacancies]
+        async with self.acquire() as conn:
+            try:
+                async with conn.transaction():
+                    await conn.execute(CREATE_VACANCIES_STAGE)
+                    await conn.copy_records_to_table(
+                        'vacancies_hh_stage', records=records, columns=VACANCY_COLUMNS
+                    )
+                    inserted = await conn.fetch(MERGE_VACANCIES_STAGE)
+                    return {str(r['id']) for r in inserted}
+            except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                if _connection_lost(conn, e):
+                    # executemany на потерянном соединении тоже упадёт; пачку повторит run()
+                    if isinstance(e, CONNECTION_ERRORS):
+                        raise
+                    raise asyncpg.ConnectionDoesNotExistError(str(e)) from e
+                # COPY может быть недоступен (права, прокси) — откатываемся на executemany
+                logger.warning(f"[DB] COPY не удался, вставляем через executemany: {e}")
+                async with conn.transaction():
+                    # ON CONFLICT DO NOTHING не говорит, что вставлено: уже известные ID
+                    # читаем в той же транзакции и исключаем из результата
+                    existing = await conn.fetch(GET_EXISTING_IDS, [record[0] for record in records])
+                    await conn.executemany(INSERT_VACANCY, records)
+                known = {r['id'] for r in existing}
+                return {str(record[0]) for record in records if record[0] not in known}
 
+    @_query('add_user')
     async def add_user(self, chat_id: int):
-        async with self.pool.acquire() as conn:
-            await conn.execute(
-                '''INSERT INTO users (chat_id) 
-                VALUES ($1)
+        async with self.acquire() as conn:
+            user = await conn.fetchrow(
+                f'''INSERT INTO users (chat_id, last_seq) 
+                VALUES ($1, ({GET_MAX_INGEST_SEQ}))
                 ON CONFLICT (chat_id) DO UPDATE
-                SET last_check = NOW()
+                SET last_check = NOW(), last_seq = EXCLUDED.last_seq
+                RETURNING chat_id, update_interval, last_check
                 ''',
                 chat_id
-            )   
+            )
+            await conn.execute(NOTIFY_USERS_CHANGED, str(chat_id))
+            return user
 
+    @_query('unsubscribe_user')
     async def unsubscribe_user(self, chat_id: int):
-        async with self.pool.acquire() as conn:
+        async with self.acquire() as conn:
             await conn.execute(
                 'DELETE FROM users WHERE chat_id = $1',
                 chat_id
             )
+            await conn.execute(NOTIFY_USERS_CHANGED, str(chat_id))
 
+    @_query('get_user')
     async def get_user(self, chat_id: int):
-        async with self.pool.acquire() as conn:
+        async with self.acquire() as conn:
             return await conn.fetchrow(
-                'SELECT * FROM users WHERE chat_id = $1',
+                f'SELECT {USER_COLUMNS} FROM users WHERE chat_id = $1',
                 chat_id
             )
\ No newline at end of file
@@ -1,11 +1,235 @@
-GET_EXISTING_IDS = 'SELECT id FROM vacancies_hh'
+GET_EXISTING_IDS = 'SELECT id FROM vacancies_hh WHERE id = ANY($1::bigint[])'
 
-INSERT_VACANCY = '''
-INSERT INTO vacancies_hh (
-    id, vacancy_name, schedule, experience, city, employer,
-    salary_from, salary_to, type, url, key_skills, professional_role,
-    description, published_at, experience_cat, grade, predicted_salary
-) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17)
-ON CONFLICT (id) DO NOTHING
+# колонки записи вакансии (Database._vacancy_record); description хранится отдельно
+VACANCY_COLUMNS = [
+    'id', 'vacancy_name', 'schedule', 'experience', 'city', 'employer',
+    'salary_from', 'salary_to', 'type', 'url', 'key_skills', 'professional_role',
+    'description', 'published_at', 'experience_cat', 'grade', 'predicted_salary', 'card',
+]
+
+# колонки самой vacancies_hh: строки остаются короткими, длинный текст — в vacancy_descriptions
+VACANCY_ROW_COLUMNS = [column for column in VACANCY_COLUMNS if column != 'description']
+
+_ROW_PARAMS = ', '.join(f'${i}' for i, column in enumerate(VACANCY_COLUMNS, 1) if column != 'description')
+_DESCRIPTION_PARAM = f"${VACANCY_COLUMNS.index('description') + 1}"
+
+INSERT_VACANCY = f'''
+WITH inserted AS (
+    INSERT INTO vacancies_hh ({', '.join(VACANCY_ROW_COLUMNS)})
+    VALUES ({_ROW_PARAMS})
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id
+)
+INSERT INTO vacancy_descriptions (vacancy_id, description)
+SELECT id, {_DESCRIPTION_PARAM}::text FROM inserted WHERE {_DESCRIPTION_PARAM}::text IS NOT NULL
+ON CONFLICT DO NOTHING
+'''
+
+
+# только нужные колонки, без ограничений и дефолтов (ingest_seq назначается при слиянии)
+CREATE_VACANCIES_STAGE = f'''
+CREATE TEMP TABLE vacancies_hh_stage ON COMMIT DROP AS
+SELECT {', '.join(VACANCY_ROW_COLUMNS)}, NULL::text AS description FROM vacancies_hh WITH NO DATA
+'''
+
+MERGE_VACANCIES_STAGE = f'''
+WITH inserted AS (
+    INSERT INTO vacancies_hh ({', '.join(VACANCY_ROW_COLUMNS)})
+    SELECT {', '.join(VACANCY_ROW_COLUMNS)} FROM vacancies_hh_stage
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id
+), descriptions AS (
+    INSERT INTO vacancy_descriptions (vacancy_id, description)
+    SELECT s.id, s.description FROM vacancies_hh_stage s JOIN inserted USING (id)
+    WHERE s.description IS NOT NULL
+    ON CONFLICT DO NOTHING
+)
+SELECT id FROM inserted
+'''
+
+# ingest_seq — монотонный номер вставки, курсор доставки пользователям
+CREATE_VACANCY_INDEXES = '''
+ALTER TABLE vacancies_hh ADD COLUMN IF NOT EXISTS ingest_seq BIGSERIAL;
+ALTER TABLE vacancies_hh ADD COLUMN IF NOT EXISTS card TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS vacancies_hh_ingest_seq_idx ON vacancies_hh (ingest_seq);
+CREATE INDEX IF NOT EXISTS vacancies_hh_published_at_idx ON vacancies_hh (published_at DESC);
+CREATE TABLE IF NOT EXISTS vacancy_queries (
+    vacancy_id BIGINT NOT NULL,
+    query_key TEXT NOT NULL,
+    PRIMARY KEY (vacancy_id, query_key)
+);
+'''
+
+# колонки, которые нужны для карточки вакансии в рассылке
+GET_VACANCIES_AFTER = '''
+SELECT ingest_seq, id, vacancy_name, employer, city,
+       salary_from, salary_to, predicted_salary, grade, url, card,
+       ARRAY(SELECT query_key FROM vacancy_queries q WHERE q.vacancy_id = v.id) AS query_keys
+FROM vacancies_hh v
+WHERE ingest_seq > $1
+ORDER BY ingest_seq
+LIMIT $2
+'''
+
+GET_RECENT_VACANCIES = '''
+SELECT id, published_at, vacancy_name, employer, city,
+       salary_from, salary_to, predicted_salary, grade, url, card
+FROM vacancies_hh
+WHERE published_at IS NOT NULL
+ORDER BY published_at DESC
+LIMIT $1
+'''
+
+GET_MAX_INGEST_SEQ = 'SELECT COALESCE(MAX(ingest_seq), 0) FROM vacancies_hh'
+
+# какими поисковыми запросами (ключ SearchProfile.query_key) найдена вакансия
+INSERT_VACANCY_QUERIES = '''
+INSERT INTO vacancy_queries (vacancy_id, query_key)
+SELECT * FROM unnest($1::bigint[], $2::text[])
+ON CONFLICT DO NOTHING
 '''
 
+GET_SEARCH_QUERIES = 'SELECT DISTINCT area, roles FROM users'
+
+USER_COLUMNS = 'chat_id, update_interval, last_check, last_seq, area, roles, grade, min_salary'
+
+UPDATE_USER_PROFILE = f'''
+UPDATE users SET area = $2, roles = $3, grade = $4, min_salary = $5
+WHERE chat_id = $1
+RETURNING {USER_COLUMNS}
+'''
+
+# созревшие пользователи, которых сейчас не рассылает другой экземпляр; строки, занятые
+# параллельной выборкой, пропускаются, а не ждут её
+CLAIM_USERS = f'''
+WITH claimed AS (
+    SELECT chat_id AS claimed_id FROM users
+    WHERE chat_id = ANY($1::bigint[])
+      AND (lease_until IS NULL OR lease_until < NOW() OR lease_owner = $2)
+      -- срок проверяется и здесь: расписание другого экземпляра могло не увидеть свежий last_check.
+      -- last_check хранится в UTC без пояса; 5 секунд — запас на расхождение часов бота и базы
+      AND (last_check IS NULL
+           OR last_check + update_interval * interval '1 minute'
+              <= (NOW() AT TIME ZONE 'UTC') + interval '5 seconds')
+    ORDER BY chat_id
+    FOR UPDATE SKIP LOCKED
+)
+UPDATE users SET lease_owner = $2, lease_until = NOW() + make_interval(secs => $3)
+FROM claimed
+WHERE chat_id = claimed.claimed_id
+RETURNING {USER_COLUMNS}
+'''
+
+# продление аренды, пока экземпляр ещё рассылает взятых пользователей
+RENEW_LEASES = '''
+UPDATE users SET lease_until = NOW() + make_interval(secs => $3)
+WHERE chat_id = ANY($1::bigint[]) AND lease_owner = $2
+'''
+
+# подписки и интервалы меняются через любой экземпляр; остальные узнают об этом по LISTEN
+USERS_CHANGED_CHANNEL = 'users_changed'
+NOTIFY_USERS_CHANGED = f"SELECT pg_notify('{USERS_CHANGED_CHANNEL}', $1)"
+
+# состояние рассылки за цикл одним запросом; курсор только растёт, поэтому запоздалая
+# или повторная запись не откатывает пользователя назад. Аренда снимается тем же запросом,
+# но только своя: если она истекла и пользователя взял другой экземпляр, её не трогаем
+UPDATE_USERS_STATE = '''
+UPDATE users AS u
+SET last_check = s.last_check,
+    last_seq = GREATEST(u.last_seq, s.last_seq),
+    lease_until = CASE WHEN u.lease_owner = $4 THEN NULL ELSE u.lease_until END,
+    lease_owner = CASE WHEN u.lease_owner = $4 THEN NULL ELSE u.lease_owner END
+FROM unnest($1::bigint[], $2::timestamptz[], $3::bigint[]) AS s(chat_id, last_check, last_seq)
+WHERE u.chat_id = s.chat_id
+'''
+
+# сохранённые предсказания моделей по отпечатку признаков (services.prediction_cache)
+CREATE_ML_PREDICTIONS = '''
+CREATE TABLE IF NOT EXISTS ml_predictions (
+    model_version TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    predicted_salary INT,
+    PRIMARY KEY (model_version, fingerprint)
+)
+'''
+
+GET_ML_PREDICTIONS = '''
+SELECT fingerprint, grade, predicted_salary FROM ml_predictions
+WHERE model_version = $1 AND fingerprint = ANY($2::text[])
+'''
+
+# зарплата могла быть не нужна в первый раз — дописываем её, когда она появится
+UPSERT_ML_PREDICTIONS = '''
+INSERT INTO ml_predictions AS p (model_version, fingerprint, grade, predicted_salary)
+SELECT $1, * FROM unnest($2::text[], $3::text[], $4::int[])
+ON CONFLICT (model_version, fingerprint) DO UPDATE
+SET predicted_salary = COALESCE(p.predicted_salary, EXCLUDED.predicted_salary)
+'''
+
+# хранение: описания в отдельной таблице (TOAST сжимает их сам), архив устаревших вакансий
+# и представление с описаниями для аналитики
+_ARCHIVE_COLUMNS = ', '.join(VACANCY_ROW_COLUMNS + ['ingest_seq'])
+
+CREATE_VACANCY_STORAGE = f'''
+ALTER TABLE vacancies_hh ALTER COLUMN description DROP NOT NULL;
+CREATE TABLE IF NOT EXISTS vacancy_descriptions (
+    vacancy_id BIGINT PRIMARY KEY,
+    description TEXT NOT NULL
+);
+-- строки, чьё описание ещё не перенесено в vacancy_descriptions; после переноса индекс пуст
+CREATE INDEX IF NOT EXISTS vacancies_hh_description_idx ON vacancies_hh (id) WHERE description IS NOT NULL;
+CREATE TABLE IF NOT EXISTS vacancies_hh_archive (LIKE vacancies_hh);
+CREATE OR REPLACE VIEW vacancies_hh_full AS
+SELECT {', '.join(f'v.{column}' for column in VACANCY_ROW_COLUMNS + ['ingest_seq'])},
+       COALESCE(d.description, v.description) AS description
+FROM vacancies_hh v
+LEFT JOIN vacancy_descriptions d ON d.vacancy_id = v.id;
+'''
+
+# переносит порцию старых описаний из vacancies_hh в vacancy_descriptions
+MOVE_DESCRIPTIONS = '''
+WITH batch AS (
+    SELECT id, description FROM vacancies_hh
+    WHERE description IS NOT NULL
+    LIMIT $1
+    FOR UPDATE SKIP LOCKED
+), cleared AS (
+    UPDATE vacancies_hh v SET description = NULL
+    FROM batch WHERE v.id = batch.id
+), moved AS (
+    INSERT INTO vacancy_descriptions (vacancy_id, description)
+    SELECT id, description FROM batch
+    ON CONFLICT DO NOTHING
+)
+SELECT count(*) FROM batch
+'''
+
+# порция вакансий старше $1: удаляется вместе с описаниями и связями с запросами
+_EXPIRE_VACANCIES = '''
+WITH expired AS (
+    SELECT id FROM vacancies_hh
+    WHERE published_at < $1
+    ORDER BY published_at
+    LIMIT $2
+    FOR UPDATE SKIP LOCKED
+), removed AS (
+    DELETE FROM vacancies_hh v USING expired e WHERE v.id = e.id RETURNING v.*
+), descriptions AS (
+    DELETE FROM vacancy_descriptions d USING expired e WHERE d.vacancy_id = e.id
+    RETURNING d.vacancy_id, d.description
+), queries AS (
+    DELETE FROM vacancy_queries q USING expired e WHERE q.vacancy_id = e.id
+)
+'''
+
+DELETE_EXPIRED_VACANCIES = _EXPIRE_VACANCIES + 'SELECT count(*) FROM removed'
+
+ARCHIVE_EXPIRED_VACANCIES = _EXPIRE_VACANCIES + f''', archived AS (
+    INSERT INTO vacancies_hh_archive ({_ARCHIVE_COLUMNS}, description)
+    SELECT {_ARCHIVE_COLUMNS}, COALESCE(d.description, r.description)
+    FROM removed r LEFT JOIN descriptions d ON d.vacancy_id = r.id
+    RETURNING 1
+)
+SELECT count(*) FROM archived
+'''
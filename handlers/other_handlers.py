@@ -1,10 +1,10 @@
 from aiogram.types import Message
 from aiogram import F, Router
 from lexicon.lexicon import LEXICON_RU
-from database.database import Database
-from services.hh_parser import fetch_hh_ids, fetch_vacancy, process_vacancy
+from services.ingest import VacancyIngestor
+from services.latest import LatestVacancies
+from services.sender import pack_messages
 
-import aiohttp
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,87 +13,38 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 @router.message(F.text.lower().startswith('начать'))
-async def start_parsing(message: Message, db: Database):
+async def start_parsing(message: Message, ingestor: VacancyIngestor):
     await message.answer(text=LEXICON_RU['начать'])
     try:
-        last_published = await db.get_last_published_time()
-        logging.info(f"[FETCH] Запрашиваем вакансии с {last_published}")
-        
-        async with aiohttp.ClientSession() as session:
-            new_ids = await fetch_hh_ids(session, date_from=last_published)
-            
-            existing_ids = await db.get_existing_ids()
-            ids_to_process = [id for id in new_ids if id not in existing_ids]
+        summary = await ingestor.run_once()
 
-            vacancies_to_send = []
-            for vac_id in ids_to_process:
-                try:
-                    raw_vacancy = await fetch_vacancy(session, vac_id)
-                    processed = process_vacancy(raw_vacancy)
-                    await db.insert_vacancy(processed)
-                    vacancies_to_send.append(processed)
-                except Exception as e:
-                    logger.error(f"Ошибка при обработке вакансии с ID {vac_id}: {e}", exc_info=True)
-                    continue
-            
+        if summary.inserted:
+            await message.answer(f"Добавлено {summary.inserted} новых вакансий!")
+            if summary.inserted > len(summary.cards):
+                await message.answer(f"Показываю первые {len(summary.cards)}.")
 
-            if vacancies_to_send:
-                await message.answer(f"Добавлено {len(ids_to_process)} новых вакансий!")
-                response_parts = []
-                for vacancy in vacancies_to_send:
-                    salary_info = ""
-                    if vacancy.get("salary_from"):
-                        salary_info = f"💵 Зарплата: {vacancy['salary_from']} – {vacancy['salary_to'] or '?'}"
-                    else:
-                        salary_info = f"💸 Примерная зарплата: {vacancy['predicted_salary']}"
-
-                    response_parts.append(
-                                f"🔥 <b>{vacancy['vacancy_name']}</b>\n"
-                                f"🏢 {vacancy.get('employer', 'Работодатель не указан')}\n"
-                                f"📍 {vacancy.get('city', 'Город не указан')}\n"
-                                f"{salary_info}\n"
-                                f"🎯 Грейд: {vacancy.get('grade', 'Не определен')}\n"
-                                f"🔗 <a href='{vacancy.get('url', '#')}'>Подробнее</a>"
-                            )
-
-                # Разбиваем по 5 вакансий на сообщение
-                for i in range(0, len(response_parts), 5):
-                    await message.answer('\n\n'.join(response_parts[i:i+5]), parse_mode='HTML')
-            else:
-                await message.answer("Новых вакансий пока нет.")
+            # Разбиваем по 5 вакансий на сообщение (и не больше 4096 символов)
+            for text in pack_messages(summary.cards, 5):
+                await message.answer(text, parse_mode='HTML')
+        else:
+            await message.answer("Новых вакансий пока нет.")
 
     except Exception as e:
         logger.error(f"Произошла критическая ошибка: {e}", exc_info=True)
 
 @router.message(F.text.lower().startswith('да'))
-async def process_yes_answer(message: Message, db: Database):
+async def process_yes_answer(message: Message, latest: LatestVacancies):
 
     try:
-        vacancies = await db.get_recent_vacancies()
+        # готовые сообщения из памяти; в БД буфер ходит только при холодном старте
+        messages = await latest.messages()
     
-        if not vacancies:
+        if not messages:
             await message.answer('Вакансий не найдено')
             return
 
-    # форматируем вакансии в читаемый вид
-        response= []
-        for vacancy in vacancies:
-            salary_info = ""
-            if vacancy.get("salary_from"):
-                salary_info = f"💵 Зарплата: {vacancy['salary_from']} – {vacancy['salary_to'] or '?'}"
-            else:
-                salary_info = f"💸 Примерная зарплата: {vacancy['predicted_salary']}"
-            response.append( 
-                        f"🔥 <b>{vacancy['vacancy_name']}</b>\n"
-                                f"🏢 {vacancy.get('employer', 'Работодатель не указан')}\n"
-                                f"📍 {vacancy.get('city', 'Город не указан')}\n"
-                                f"{salary_info}\n"
-                                f"🎯 Грейд: {vacancy.get('grade', 'Не определен')}\n"
-                                f"🔗 <a href='{vacancy.get('url', '#')}'>Подробнее</a>"
-            )
-        # Разбиваем на сообщения по 5 вакансий
-        for i in range(0, len(response), 5):
-            await message.answer('\n'.join(response[i:i+5]), parse_mode='HTML')
+        for text in messages:
+            await message.answer(text, parse_mode='HTML')
 
     except Exception as e:
        logger.error(f"Произошла ошибка при получении вакансий: {str(e)}", exc_info=True)
@@ -3,10 +3,15 @@ from aiogram.filters import Command, CommandStart
 from aiogram import Router
 from lexicon.lexicon import LEXICON_RU
 from database.database import Database
+from services.profiles import SearchProfile
+from services.scheduler import NullScheduler, UserScheduler
 from zoneinfo import ZoneInfo
 
 router = Router()
 
+# ключи /profile key=value; salary попадает в SearchProfile.min_salary
+PROFILE_FIELDS = {'area', 'roles', 'grade', 'salary'}
+
 @router.message(CommandStart())
 async def process_start_command(message: Message):
     await message.answer(text=LEXICON_RU['/start'])
@@ -16,16 +21,18 @@ async def process_help_command(message: Message):
     await message.answer(text=LEXICON_RU['/help'])
 
 @router.message(Command('subscribe'))
-async def subscribe(message: Message, db: Database):
+async def subscribe(message: Message, db: Database, scheduler: UserScheduler | NullScheduler):
     chat_id = message.chat.id
-    await db.add_user(chat_id)
+    user = await db.add_user(chat_id)
+    scheduler.schedule(chat_id, user['update_interval'], user['last_check'])
     await message.answer("Вы успешно подписаны на обновления вакансий!")
 
 
 @router.message(Command('unsubscribe'))
-async def unsubscribe(message: Message, db: Database):
+async def unsubscribe(message: Message, db: Database, scheduler: UserScheduler | NullScheduler):
     chat_id = message.chat.id
     await db.unsubscribe_user(chat_id)
+    scheduler.remove(chat_id)
     await message.answer("Вы отписаны от обновлений вакансий.")
 
 
@@ -42,15 +49,53 @@ async def status(message: Message, db: Database):
         await message.answer("Вы не подписаны на обновления.")
 
 @router.message(Command('set_interval'))
-async def set_interval(message: Message, db: Database):
+async def set_interval(message: Message, db: Database, scheduler: UserScheduler | NullScheduler):
     try:
         interval = int(message.text.split()[-1])
         if interval < 5:
             await message.answer("Интервал должен быть не менее 5 минут.")
             return
         
-        await db.update_user_settings(message.chat.id, interval)
+        user = await db.update_user_settings(message.chat.id, interval)
+        scheduler.schedule(message.chat.id, interval, user['last_check'])
         await message.answer(f"Интервал обновления успешно установлен на {interval} минут.")
     except:
         await message.answer("Использование: /set_interval <минуты>")
 
+
+@router.message(Command('profile'))
+async def profile(message: Message, db: Database):
+    user = await db.get_user(message.chat.id)
+    if not user:
+        await message.answer("Сначала подпишитесь на обновления: /subscribe")
+        return
+
+    args = message.text.split()[1:]
+    if not args:
+        await message.answer(f"Текущий профиль поиска:\n{SearchProfile.from_user(user).describe()}")
+        return
+
+    try:
+        if args == ['reset']:
+            new_profile = SearchProfile()
+        else:
+            fields = dict(arg.split('=', 1) for arg in args)
+            # неизвестный ключ — скорее опечатка, молча игнорировать его нельзя
+            if fields.keys() - PROFILE_FIELDS:
+                raise ValueError(f"Неизвестные параметры: {fields.keys() - PROFILE_FIELDS}")
+            # регион уходит в запрос к HH как есть — пропускаем только числовой ID
+            if 'area' in fields and not (fields['area'].isascii() and fields['area'].isdigit()):
+                raise ValueError(f"Регион должен быть числом: {fields['area']}")
+            current = SearchProfile.from_user(user)
+            new_profile = SearchProfile(
+                area=fields.get('area', current.area),
+                roles=tuple(int(role) for role in fields['roles'].split(',')) if 'roles' in fields else current.roles,
+                grade=fields.get('grade', current.grade),
+                min_salary=int(fields['salary']) if 'salary' in fields else current.min_salary,
+            )
+    except ValueError:
+        await message.answer(LEXICON_RU['/profile'])
+        return
+
+    await db.update_user_profile(message.chat.id, new_profile)
+    await message.answer(f"Профиль поиска обновлён:\n{new_profile.describe()}")
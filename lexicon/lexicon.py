@@ -8,7 +8,10 @@ LEXICON_RU: dict[str, str] = {
     'Также с помощью моделей машинного обучения я определяю грейды вакансий и примерную разплату, '
     'если она не указана в вакансии.'
     '/subscribe - Подписаться на рассылку, /unsubscribe - Отписаться от рассылки, /status - статус подписки, '
-    '/set_interval 15 - Установить интервал обновления (в минутах), например 15.',
+    '/set_interval 15 - Установить интервал обновления (в минутах), например 15, '
+    '/profile - профиль поиска (регион, роли, грейд, зарплата).',
+    '/profile': 'Использование: /profile area=1 roles=10,156 grade=Middle salary=150000 '
+    '(можно указать любые из параметров) или /profile reset для сброса.',
     'начать': 'Отлично! Я начал поиск вакансий. Если хотите узнать, что я умею, напишите /help.',
     'да': 'Вот вакансии',
     'нет': 'Пока тут пусто.',
@@ -23,4 +26,5 @@ LEXICON_COMMANDS: dict[str, str] = {
     '/unsubscribe': 'Отписаться от рассылки',
     '/status': 'Посмотреть статус подписки',
     '/set_interval': 'Установить интервал обновления (нужно добавить число в минутах)',
+    '/profile': 'Профиль поиска: регион, роли, грейд, зарплата',
 }
\ No newline at end of file
@@ -1,50 +1,138 @@
 import asyncio
+import time
+
+_started = time.perf_counter()
 
 from aiogram  import Bot, Dispatcher
 from config.config import Config, load_config
 from handlers import user_handlers, other_handlers
 from database.database import Database
 from services.notifier import VacancyNotifier
+from services.hh_parser import HHClient
+from services.ingest import VacancyIngestor
+from services.latest import LatestVacancies
+from services.metrics import start_metrics_server
+from services.processing import VacancyProcessor
+from services.retention import StorageMaintenance
+from services.scheduler import NullScheduler
+from services.sender import MessageSender
+from services.webhook import start_webhook
 from keyboards.set_menu import set_main_menu
 
 import logging
 
-# задаем уровень логов
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                    handlers=[logging.StreamHandler()])
+IMPORT_TIME = time.perf_counter() - _started
+
+logger = logging.getLogger(__name__)
 
 # функция для запуска бота
 async def main() -> None:
     # загружаем конфиг
     config: Config = load_config()
 
+    # задаем уровень логов
+    logging.basicConfig(level=config.monitoring.log_level.upper(),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler()])
+    logger.info(f"[STARTUP] Импорт модулей: {IMPORT_TIME:.2f} с")
+
+    # метрики Prometheus на локальном порту
+    metrics_runner = None
+    if config.monitoring.metrics_port:
+        metrics_runner = await start_metrics_server(config.monitoring.metrics_host,
+                                                    config.monitoring.metrics_port)
+
     # инициализируем бот и диспетчер
+    roles = config.instance.roles
+    logger.info(f"[STARTUP] Экземпляр {config.instance.instance_id}, роли: {', '.join(sorted(roles))}")
     
     bot = Bot(token=config.tg_bot.token)
     dp = Dispatcher()
 
     # вызываем кнопку menu
-    await set_main_menu(bot)
+    if 'bot' in roles:
+        await set_main_menu(bot)
 
     # Инициализируем БД
     database = Database(config.db)
     await database.connect()
     await database.create_users_table()
+    await database.create_vacancy_indexes()
+    await database.create_storage_tables()
+
+    # Общая сессия к api.hh.ru
+    hh_client = HHClient(config.hh)
+    await hh_client.start()
+
+    # Разбор и предсказания моделей — в отдельных воркерах, чтобы не блокировать бота
+    prediction_db = None
+    if config.ml.prediction_store:
+        await database.create_predictions_table()
+        prediction_db = database
+    processor = VacancyProcessor(config.ml, prediction_db)
+    if 'ingest' in roles:
+        processor.start()
+
+    # Последние вакансии для команды «да»: пополняются загрузкой, БД — только на старте
+    latest = LatestVacancies(database)
+
+    # Загрузка вакансий с HH — один раз за тик для всех пользователей и всех экземпляров
+    ingestor = VacancyIngestor(database, hh_client, processor,
+                               config.hh.ingest_interval, config.ml.batch_size, config.pipeline, latest)
+    if 'ingest' in roles:
+        asyncio.create_task(ingestor.start())
+        # перенос описаний и удаление устаревших вакансий
+        asyncio.create_task(StorageMaintenance(database, config.storage).start())
+
+    # Очередь отправки сообщений с лимитами Telegram
+    sender = MessageSender(bot, config.notifier.send_workers,
+                           config.notifier.global_rate, config.notifier.chat_rate)
+    sender.start()
 
-    # Запуск фонового нотификатора
-    notifier = VacancyNotifier(bot, database)
-    asyncio.create_task(notifier.start())
+    # Запуск фонового нотификатора; без этой роли хендлерам нужна только заглушка расписания
+    notifier = None
+    scheduler = NullScheduler()
+    if 'notifier' in roles:
+        notifier = VacancyNotifier(bot, database, sender, config.notifier, config.instance.instance_id)
+        scheduler = notifier.scheduler
+        asyncio.create_task(notifier.start())
 
-    # Добавляем БД в контекст диспетчера
+    # Добавляем БД, загрузчик вакансий и расписание рассылки в контекст диспетчера
     dp['db'] = database
+    dp['ingestor'] = ingestor
+    dp['latest'] = latest
+    dp['scheduler'] = scheduler
 
     # регистрируем роутеры в диспетчере
     dp.include_router(user_handlers.router)
     dp.include_router(other_handlers.router)
 
-    # пропускаем апдейты
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    webhook_runner = None
+    try:
+        if 'bot' not in roles:
+            logger.info(f"[STARTUP] Экземпляр без роли bot готов через {time.perf_counter() - _started:.2f} с")
+            await asyncio.Event().wait()
+        elif config.webhook.url:
+            webhook_runner = await start_webhook(bot, dp, config.webhook)
+            logger.info(f"[STARTUP] Бот готов принимать апдейты через {time.perf_counter() - _started:.2f} с после запуска")
+            await asyncio.Event().wait()
+        else:
+            # пропускаем апдейты
+            await bot.delete_webhook(drop_pending_updates=True)
+            logger.info(f"[STARTUP] Бот готов принимать апдейты через {time.perf_counter() - _started:.2f} с после запуска")
+            await dp.start_polling(bot)
+    finally:
+        if webhook_runner is not None:
+            await webhook_runner.cleanup()
+        await hh_client.close()
+        await sender.close()
+        # состояние рассылки, накопленное с последнего цикла
+        if notifier is not None:
+            await notifier.close()
+        processor.shutdown()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await bot.session.close()
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
@@ -1,30 +1,253 @@
-from catboost import CatBoostClassifier, CatBoostRegressor, Pool
-
+from collections import deque
+from dataclasses import dataclass, fields, replace
+from functools import lru_cache
+from pathlib import Path
+import hashlib
+import json
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+MODELS_DIR = "models"
+TASKS = ('grade', 'salary')
+
+# признаки, которые умеет готовить services.hh_parser.parse_vacancy (+ предсказанный грейд)
+KNOWN_FEATURES = {'vacancy_name', 'schedule', 'experience', 'experience_cat', 'salary_to',
+                  'key_skills', 'description', 'grade'}
+
+# как часто воркер пишет в лог сводку теневой оценки, в батчах
+SHADOW_LOG_EVERY = 20
+
+# сколько замеров держать, если их никто не забирает (модели вызываются вне _predict_in_worker)
+MAX_TIMINGS = 1000
+
+
+def model_path(name: str) -> str:
+    return os.path.join(MODELS_DIR, f'{name}.cbm')
+
+
+def discover_models(models_dir: str = MODELS_DIR) -> dict[str, list[str]]:
+    """Версии моделей по задачам: grade_model*.cbm и salary_model*.cbm в каталоге моделей."""
+    found = {task: [] for task in TASKS}
+    for path in sorted(Path(models_dir).glob('*.cbm')):
+        task = path.stem.split('_', 1)[0]
+        if task in found:
+            found[task].append(path.stem)
+    return found
+
+
+def model_version(*paths: str) -> str:
+    """Версия набора моделей — хэш содержимого файлов; меняется при замене любого .cbm."""
+    stats = tuple((path, os.stat(path).st_mtime_ns, os.stat(path).st_size) for path in paths)
+    return _hash_files(stats)
+
+
+@lru_cache(maxsize=16)
+def _hash_files(stats: tuple) -> str:
+    digest = hashlib.sha1()
+    for path, _, _ in stats:
+        with open(path, 'rb') as f:
+            digest.update(hashlib.file_digest(f, 'sha1').digest())
+    return digest.hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class ModelSelection:
+    """Активные версии моделей (имена файлов без .cbm) и, опционально, теневые кандидаты."""
+    grade: str = 'grade_model_new'
+    salary: str = 'salary_model_new'
+    shadow_grade: str | None = None
+    shadow_salary: str | None = None
+
+    @property
+    def version(self) -> str:
+        # от теневых моделей результат не зависит, поэтому в версию они не входят
+        return model_version(model_path(self.grade), model_path(self.salary))
+
+    def validate(self):
+        available = discover_models()
+        for task, name in (('grade', self.grade), ('salary', self.salary),
+                           ('grade', self.shadow_grade), ('salary', self.shadow_salary)):
+            if name is not None and name not in available[task]:
+                raise ValueError(f"Модель {name} не найдена, доступны: {', '.join(available[task])}")
+
+
+def read_selection(path: str | None, default: ModelSelection) -> ModelSelection:
+    """Выбор моделей из JSON-файла поверх default (значений из окружения).
+
+    Ключи файла — поля ModelSelection (grade, salary, shadow_grade, shadow_salary); null
+    у теневой модели выключает её. Нет файла — действует default.
+    """
+    if not path:
+        return default
+    try:
+        with open(path, encoding='utf-8') as f:
+            overrides = json.load(f)
+    except FileNotFoundError:
+        return default
+    known = {field.name for field in fields(ModelSelection)}
+    if not isinstance(overrides, dict) or set(overrides) - known:
+        raise ValueError(f"{path}: ожидается объект с ключами {', '.join(sorted(known))}")
+    return replace(default, **overrides)
+
+
+class TaskModel:
+    """Одна модель CatBoost; порядок и типы признаков берутся из самого .cbm."""
+
+    def __init__(self, name: str, classifier: bool):
+        # catboost импортируется здесь, а не при импорте модуля: это почти секунда на старте бота
+        from catboost import CatBoostClassifier, CatBoostRegressor
+
+        self.name = name
+        self.path = model_path(name)
+        self.model = (CatBoostClassifier if classifier else CatBoostRegressor)().load_model(self.path)
+        self.features = list(self.model.feature_names_)
+        unknown = set(self.features) - KNOWN_FEATURES
+        if unknown:
+            raise ValueError(f"Модели {name} нужны неизвестные признаки: {', '.join(sorted(unknown))}")
+        self.cat_features = list(self.model.get_cat_feature_indices())
+        self.text_features = list(self.model.get_text_feature_indices())
+        self._numeric = [i not in self.cat_features and i not in self.text_features
+                         for i in range(len(self.features))]
+
+    def predict(self, features: list[dict]):
+        from catboost import Pool
+
+        # строки в порядке признаков модели, без DataFrame
+        nan = float('nan')
+        rows = [
+            [
+                (nan if feature.get(name) is None else float(feature[name])) if numeric
+                else feature.get(name)
+                for name, numeric in zip(self.features, self._numeric)
+            ]
+            for feature in features
+        ]
+        pool = Pool(data=rows, cat_features=self.cat_features, text_features=self.text_features,
+                    feature_names=self.features)
+        return self.model.predict(pool)
+
+
+@dataclass
+class ShadowStats:
+    rows: int = 0
+    agreed: int = 0
+    batches: int = 0
+    active_seconds: float = 0.0
+    shadow_seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (f"согласие {self.agreed / self.rows:.1%} на {self.rows} строках, "
+                f"{self.shadow_seconds / self.rows * 1000:.3f} мс/строка против "
+                f"{self.active_seconds / self.rows * 1000:.3f} у активной модели")
+
+
+def _labels(predictions) -> list[str]:
+    if getattr(predictions, 'ndim', 1) == 2:
+        predictions = predictions[:, 0]
+    return [str(label) for label in predictions]
+
+
+def _salaries_agree(active: float, shadow: float) -> bool:
+    return abs(active - shadow) <= 0.1 * abs(active)
+
+
 class MlModels:
-    def __init__(self):
-        self.model_grade_path = "models/grade_model_new.cbm"
-        self.model_salary_path = "models/salary_model_new.cbm"
-        self.grade_model = CatBoostClassifier().load_model(self.model_grade_path)
-        self.salary_model = CatBoostRegressor().load_model(self.model_salary_path)
-        
-
-    def predict_grade(self, features):
-        cat_features = ['schedule', 'experience']
-        text_features = ['vacancy_name', 'key_skills', 'description']
-        pool = Pool(data=features, cat_features=cat_features, text_features=text_features)
-        grade = self.grade_model.predict(pool)
-        #logger.info(f"Прогноз: {grade}")
-        return str(grade[0, 0])
-    
-    def predict_salary(self, features):
-        cat_features = ['schedule', 'grade', 'experience']
-        text_features = ['vacancy_name', 'key_skills', 'description']
-
-        pool = Pool(data=features, cat_features=cat_features, text_features=text_features)
-        salary = self.salary_model.predict(pool)
-        return salary[0]
-        
\ No newline at end of file
+    def __init__(self, selection: ModelSelection = ModelSelection()):
+        self.selection = selection
+        self.grade_model = TaskModel(selection.grade, classifier=True)
+        self.salary_model = TaskModel(selection.salary, classifier=False)
+        self.shadow_grade_model = (TaskModel(selection.shadow_grade, classifier=True)
+                                   if selection.shadow_grade else None)
+        self.shadow_salary_model = (TaskModel(selection.shadow_salary, classifier=False)
+                                    if selection.shadow_salary else None)
+        self.version = selection.version
+        self.shadow_stats = {task: ShadowStats() for task in TASKS}
+        # (модель, строк, секунд) по вызовам; забирается drain_timings() для метрик
+        self.timings: deque[tuple[str, int, float]] = deque(maxlen=MAX_TIMINGS)
+
+    def predict_grade_batch(self, features: list[dict]) -> list[str]:
+        # один Pool на весь батч: накладные расходы CatBoost не растут с числом строк
+        started = time.perf_counter()
+        grades = _labels(self.grade_model.predict(features))
+        elapsed = time.perf_counter() - started
+        self.timings.append((self.grade_model.name, len(features), elapsed))
+        #logger.info(f"Прогноз: {grades}")
+        if self.shadow_grade_model:
+            self._shadow('grade', self.shadow_grade_model, features, grades,
+                         elapsed, lambda a, b: a == b, _labels)
+        return grades
+
+    def predict_salary_batch(self, features: list[dict]):
+        started = time.perf_counter()
+        salaries = self.salary_model.predict(features)
+        elapsed = time.perf_counter() - started
+        self.timings.append((self.salary_model.name, len(features), elapsed))
+        if self.shadow_salary_model:
+            self._shadow('salary', self.shadow_salary_model, features, salaries,
+                         elapsed, _salaries_agree, list)
+        return salaries
+
+    def drain_timings(self) -> list[tuple[str, int, float]]:
+        timings, self.timings = self.timings, deque(maxlen=MAX_TIMINGS)
+        return list(timings)
+
+    def _shadow(self, task, model: TaskModel, features, active, active_seconds, agree, convert):
+        """Оценивает тот же батч кандидатом; ошибки кандидата не влияют на результат."""
+        started = time.perf_counter()
+        try:
+            shadow = convert(model.predict(features))
+        except Exception as e:
+            logger.warning(f"[ML] Теневая модель {model.name} упала: {e}")
+            return
+        shadow_seconds = time.perf_counter() - started
+        self.timings.append((model.name, len(features), shadow_seconds))
+        stats = self.shadow_stats[task]
+        stats.shadow_seconds += shadow_seconds
+        stats.active_seconds += active_seconds
+        stats.rows += len(features)
+        stats.agreed += sum(agree(a, s) for a, s in zip(active, shadow))
+        stats.batches += 1
+        if stats.batches % SHADOW_LOG_EVERY == 1:
+            logger.info(f"[ML] Теневая {model.name}: {stats.summary()} (pid {os.getpid()})")
+
+
+_selection = ModelSelection()
+_models: MlModels | None = None
+_models_lock = threading.Lock()
+
+
+def configure_models(selection: ModelSelection):
+    """Задаёт версии моделей процесса; используется и как initializer воркеров пула."""
+    global _selection
+    _selection = selection
+
+
+def install_models(models: MlModels):
+    """Атомарно подменяет модели процесса уже загруженными (горячая замена)."""
+    global _models, _selection
+    with _models_lock:
+        _models = models
+        _selection = models.selection
+
+
+def get_models() -> MlModels:
+    """Модели процесса, загружаются при первом обращении.
+
+    Если модели загрузить до запуска воркеров (VacancyProcessor.warm_up), форкнутые процессы
+    получают их готовыми и делят память с родителем, а не грузят свою копию.
+    """
+    global _models
+    models = _models
+    if models is None or models.selection != _selection:
+        with _models_lock:
+            if _models is None or _models.selection != _selection:
+                started = time.perf_counter()
+                _models = MlModels(_selection)
+                logger.info(f"[ML] Модели {_models.version} загружены за "
+                            f"{time.perf_counter() - started:.2f} с (pid {os.getpid()})")
+            models = _models
+    return models
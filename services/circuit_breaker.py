@@ -0,0 +1,48 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(ConnectionError):
+    """Сервис помечен недоступным, запрос не отправлялся."""
+
+
+class CircuitBreaker:
+    """Размыкается после threshold сбоев подряд и reset_timeout секунд отклоняет вызовы сразу.
+
+    Пока база лежит, каждый запрос иначе ждёт свой таймаут подключения, и задержка
+    умножается на число вызовов. По истечении таймаута вызовы снова пропускаются;
+    первый же сбой размыкает цепь заново, первый успех — замыкает.
+    """
+
+    def __init__(self, name: str, threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def check(self):
+        if self.is_open:
+            retry_in = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(f"{self.name} недоступна, следующая попытка через {retry_in:.0f} с")
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"[BREAKER] {self.name} снова доступна")
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        # после таймаута цепь полуоткрыта: достаточно одного сбоя, чтобы снова разомкнуть
+        if self.failures >= self.threshold or self.opened_at is not None:
+            if not self.is_open:
+                logger.error(f"[BREAKER] {self.name} недоступна после {self.failures} сбоев подряд, "
+                             f"запросы отклоняются {self.reset_timeout:.0f} с")
+            self.opened_at = time.monotonic()
@@ -0,0 +1,32 @@
+from database.database import Database
+from services.cache import LRUCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class VacancyDeduplicator:
+    """Отсеивает уже сохранённые вакансии, проверяя в БД только кандидатов из текущего цикла.
+
+    Перед запросом к БД ID проверяются по LRU-кэшу недавно виденных вакансий,
+    так что стоимость цикла зависит от размера батча, а не от размера таблицы.
+    """
+
+    def __init__(self, db: Database, maxsize: int = 50_000):
+        self.db = db
+        self.seen = LRUCache(maxsize)
+
+    async def filter_new(self, ids: list[str]) -> list[str]:
+        candidates = [vac_id for vac_id in ids if vac_id not in self.seen]
+        if not candidates:
+            return []
+
+        existing_ids = await self.db.get_existing_ids(candidates)
+        self.mark_seen(existing_ids)
+        logger.debug(f"[DEDUP] Кандидатов: {len(ids)}, в кэше: {len(ids) - len(candidates)}, "
+                     f"в БД: {len(existing_ids)}")
+        return [vac_id for vac_id in candidates if vac_id not in existing_ids]
+
+    def mark_seen(self, ids):
+        for vac_id in ids:
+            self.seen.set(str(vac_id), True)
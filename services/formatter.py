@@ -0,0 +1,31 @@
+from services.cache import LRUCache
+
+# готовые карточки по ID вакансии: рассылка многим пользователям переиспользует одну строку
+_cards = LRUCache(maxsize=5_000, ttl=24 * 60 * 60)
+
+
+def format_vacancy(vacancy) -> str:
+    salary_info = ""
+    if vacancy.get("salary_from"):
+        salary_info = f"💵 Зарплата: {vacancy['salary_from']} – {vacancy['salary_to'] or '?'}"
+    else:
+        salary_info = f"💸 Примерная зарплата: {vacancy['predicted_salary']}"
+
+    return (
+        f"🔥 <b>{vacancy['vacancy_name']}</b>\n"
+        f"🏢 {vacancy.get('employer', 'Работодатель не указан')}\n"
+        f"📍 {vacancy.get('city', 'Город не указан')}\n"
+        f"{salary_info}\n"
+        f"🎯 Грейд: {vacancy.get('grade', 'Не определен')}\n"
+        f"🔗 <a href='{vacancy.get('url', '#')}'>Подробнее</a>"
+    )
+
+
+def render_card(vacancy) -> str:
+    """Карточка вакансии: из кэша, из сохранённой в БД колонки card или отрисованная заново."""
+    vac_id = str(vacancy['id'])
+    card = _cards.get(vac_id)
+    if card is None:
+        card = vacancy.get('card') or format_vacancy(vacancy)
+        _cards.set(vac_id, card)
+    return card
@@ -1,14 +1,139 @@
 import aiohttp
-from bs4 import BeautifulSoup
+import asyncio
 from typing import List, Dict, Any
-from datetime import datetime, timezone
-from models.ml_models import MlModels
-import pandas as pd
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+from config.config import HHConfig
+from models.ml_models import get_models
+from services.formatter import format_vacancy
+from services.html_text import html_to_text
+from services.http_cache import CachedResponse, HttpCache, response_ttl
+from services.metrics import HH_REQUEST_SECONDS, HH_REQUESTS, LogSampler
+from services.prediction_cache import Prediction, PredictionCache, feature_fingerprint
+from services.profiles import SEARCH_PARAMS
+from services.rate_limiter import TokenBucket
 import logging
+import time
 
-ml_models = MlModels()
+# предсказания по отпечатку признаков, свой кэш в каждом воркере
+_predictions = PredictionCache(maxsize=20_000)
 
 logger =  logging.getLogger(__name__)
+# ретраи и ошибки HH однотипны — в лог не чаще раза в минуту на вид события
+_log_sampler = LogSampler(60.0)
+
+HH_API_URL = 'https://api.hh.ru'
+HH_PER_PAGE = 100
+HH_MAX_DEPTH = 2000                    # HH не отдаёт результаты глубже 2000-го
+HH_MIN_SLICE = timedelta(minutes=1)    # окно меньше этого не делим
+
+
+class HHClient:
+    """Общая сессия к api.hh.ru: пул соединений, лимит частоты на хост и повторы при 429/5xx."""
+
+    def __init__(self, config: HHConfig):
+        self.config = config
+        self.session: aiohttp.ClientSession | None = None
+        self._semaphore = asyncio.Semaphore(config.concurrency)
+        self._limiters: dict[str, TokenBucket] = {}
+        self.cache = HttpCache(config.cache_size, config.cache_dir, config.cache_disk_max_entries)
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(limit=self.config.concurrency,
+                                         limit_per_host=self.config.concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers={'User-Agent': 'vacancies_hh_parsing_bot'},
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _limiter(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        if host not in self._limiters:
+            self._limiters[host] = TokenBucket(self.config.rate_limit)
+        return self._limiters[host]
+
+    async def get_json(self, url: str, params: Dict[str, Any] | None = None,
+                       ttl: float = 0, endpoint: str = 'other',
+                       persist: bool = True) -> Dict[str, Any] | None:
+        """GET с кэшем: свежий ответ отдаётся без сети, устаревший перепроверяется по ETag/Last-Modified.
+
+        ttl — время жизни ответа, если HH не прислал Cache-Control: max-age.
+        endpoint — метка запроса в метриках.
+        persist — сохранять ли ответ в дисковый кэш (иначе только в памяти).
+        """
+        cache_key = self.cache.key(url, params)
+        cached = await self.cache.get(cache_key)
+        if cached is not None and cached.is_fresh:
+            self.cache.hits += 1
+            HH_REQUESTS.inc(endpoint=endpoint, result='cache_hit')
+            return cached.data
+
+        if self.session is None:
+            await self.start()
+
+        headers = cached.validators() if cached is not None else {}
+        limiter = self._limiter(url)
+        for attempt in range(self.config.max_retries + 1):
+            async with self._semaphore:
+                started = time.perf_counter()
+                await limiter.acquire()
+                try:
+                    async with self.session.get(url, params=params, headers=headers) as response:
+                        HH_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+                        HH_REQUESTS.inc(endpoint=endpoint, result=str(response.status))
+                        if response.status == 304 and cached is not None:
+                            self.cache.revalidated += 1
+                            cached.expires_at = time.time() + (response_ttl(response.headers, ttl) or 0)
+                            await self.cache.set(cache_key, cached, persist)
+                            return cached.data
+
+                        if response.status == 200:
+                            self.cache.misses += 1
+                            data = await response.json()
+                            lifetime = response_ttl(response.headers, ttl)
+                            entry = CachedResponse(
+                                data=data,
+                                etag=response.headers.get('ETag'),
+                                last_modified=response.headers.get('Last-Modified'),
+                                expires_at=time.time() + (lifetime or 0),
+                            )
+                            # без TTL и валидаторов запись бесполезна — не храним
+                            if lifetime is not None and (lifetime > 0 or entry.validators()):
+                                await self.cache.set(cache_key, entry, persist)
+                            return data
+
+                        if response.status != 429 and response.status < 500:
+                            _log_sampler.log(logger, logging.WARNING, f'status:{response.status}',
+                                             f"[HH] {url}: статус {response.status}")
+                            return None
+
+                        retry_after = response.headers.get('Retry-After')
+                        delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+                        _log_sampler.log(logger, logging.WARNING, f'retry:{response.status}',
+                                         f"[HH] {url}: статус {response.status}, повтор через {delay} сек")
+                        if response.status == 429:
+                            # паузу выдержит limiter.acquire() перед повтором — второй раз не спим
+                            limiter.pause(delay)
+                            delay = 0
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    HH_REQUESTS.inc(endpoint=endpoint, result='network_error')
+                    delay = 2 ** attempt
+                    _log_sampler.log(logger, logging.WARNING, f'error:{type(e).__name__}',
+                                     f"[HH] {url}: {e!r}, повтор через {delay} сек")
+
+            if attempt < self.config.max_retries and delay:
+                await asyncio.sleep(delay)
+
+        HH_REQUESTS.inc(endpoint=endpoint, result='gave_up')
+        logger.error(f"[HH] {url}: исчерпаны попытки ({self.config.max_retries + 1})")
+        return None
+
 
 def hh_datetime(dt: datetime) -> str:
     if dt.tzinfo is None:
@@ -16,46 +141,63 @@ def hh_datetime(dt: datetime) -> str:
     return dt.isoformat()
 
 
-async def fetch_hh_ids(session: aiohttp.ClientSession, date_from: datetime, max_pages: int = 3) -> List[str]:
-    ids = []
-
-    for page in range(0, max_pages):
-        params = {
-            'text': ('name:"data analyst" or "аналитик данных" or "data аналитик"'
-                    ' or "продуктовый аналитик" or "Data Analyst" or "Data analyst"'
-                    ' or "Аналитик данных" or "BI-аналитик" or "bi-аналитик"'
-                    ' not "manager" not "QA-инженер" not "Маркетолог|маркетолог" not "DWH|dwh"'),
-            'area': '113',
-            'per_page': '100',
-            'page': page,
-            'professional_role': [10, 156, 164],
-            'date_from': hh_datetime(date_from)
-        }
+async def _fetch_search_page(client: HHClient, params: Dict[str, Any], page: int) -> Dict[str, Any] | None:
+    data = await client.get_json(f'{HH_API_URL}/vacancies', params={**params, 'page': page},
+                                 ttl=client.config.search_cache_ttl, endpoint='search', persist=False)
+    if data is None:
+        logger.warning(f"Ошибка при запросе к HH.ru на странице {page}")
+    return data
 
-        async with session.get('https://api.hh.ru/vacancies', params=params) as response:
-            if response.status != 200:
-                logger.warning(f"Ошибка при запросе к HH.ru на странице {page}: {response.status}")
-                continue
 
-            data = await response.json()
-            page_ids = [item['id'] for item in data.get('items', [])]
-            ids.extend(page_ids)
-            logging.info(f"[HH] Запрос с date_from: {params['date_from']}")
+async def fetch_hh_ids(client: HHClient, date_from: datetime, date_to: datetime | None = None,
+                       search: Dict[str, Any] = SEARCH_PARAMS) -> List[str]:
+    """Собирает ID всех вакансий поискового запроса search за окно [date_from, date_to].
 
-            logging.info(f"[HH] Страница {page} — получено {len(page_ids)} ID")
+    Количество страниц берётся из первого ответа, остальные страницы запрашиваются параллельно.
+    HH отдаёт не больше HH_MAX_DEPTH результатов на запрос, поэтому если found больше,
+    окно рекурсивно делится пополам по времени.
+    """
+    if date_to is None:
+        # округляем до минуты, чтобы повторные циклы в пределах минуты попадали в кэш поиска
+        date_to = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+
+    params = {
+        **search,
+        'per_page': HH_PER_PAGE,
+        'date_from': hh_datetime(date_from),
+        'date_to': hh_datetime(date_to),
+    }
+    first = await _fetch_search_page(client, params, 0)
+    if first is None:
+        return []
 
-    return list(set(ids))
+    found = first.get('found', 0)
+    if found > HH_MAX_DEPTH and date_to - date_from > HH_MIN_SLICE:
+        middle = date_from + (date_to - date_from) / 2
+        logger.info(f"[HH] {params['date_from']} – {params['date_to']}: найдено {found}, делим окно")
+        halves = await asyncio.gather(
+            fetch_hh_ids(client, date_from, middle, search),
+            fetch_hh_ids(client, middle, date_to, search),
+        )
+        return list({vac_id for half in halves for vac_id in half})
 
-async def fetch_vacancy(session:aiohttp.ClientSession, vacancy_id: str) -> Dict[str, Any]:
-    url = f'https://api.hh.ru/vacancies/{vacancy_id}'
-    async with session.get(url) as response:
-        return await response.json()
+    pages = [first] + await asyncio.gather(
+        *(_fetch_search_page(client, params, page) for page in range(1, first.get('pages', 1)))
+    )
+    ids = {item['id'] for data in pages if data for item in data.get('items', [])}
+    logger.info(f"[HH] {params['date_from']} – {params['date_to']}: найдено {found}, "
+                f"страниц {len(pages)}, получено {len(ids)} ID")
+    return list(ids)
 
-def process_vacancy(item: Dict[str, Any]) -> Dict[str, Any]:
+async def fetch_vacancy(client: HHClient, vacancy_id: str) -> Dict[str, Any] | None:
+    return await client.get_json(f'{HH_API_URL}/vacancies/{vacancy_id}',
+                                 ttl=client.config.vacancy_cache_ttl, endpoint='vacancy')
+
+def parse_vacancy(item: Dict[str, Any]) -> tuple[Dict[str, Any], Dict[str, Any]]:
+    """Разбирает ответ HH в строку для БД и признаки для моделей (без предсказаний)."""
     description = item.get('description', 'Не указано')
     if description:
-        soup = BeautifulSoup(description, 'html.parser')
-        description = soup.get_text()
+        description = html_to_text(description)
 
     key_skills = item.get('key_skills')
     raw_skills = (
@@ -113,30 +255,74 @@ def process_vacancy(item: Dict[str, Any]) -> Dict[str, Any]:
             'published_at': published_at   
         }
 
-    features_grade = {
+    features = {
         'vacancy_name':  item.get('name'), 
         'schedule': item.get('schedule', {}).get('name') if item.get('schedule') else 'Не указано', 
         'experience': raw_experience,
+        'experience_cat': experience_cat,
         'salary_to': salary.get('to'), 
         'key_skills': processed_skills, 
         'description': description, 
     }
 
-    grade = ml_models.predict_grade(pd.DataFrame([features_grade]))
-    vacancy['grade'] = grade
-    
-    features_salary = {
-        'vacancy_name':  item.get('name'), 
-        'schedule': item.get('schedule', {}).get('name') if item.get('schedule') else 'Не указано', 
-        'salary_to': salary.get('to'), 
-        'key_skills': processed_skills, 
-        'description': description, 
-        'grade': grade,
-        'experience': raw_experience,
-        
-    }
-    if vacancy['salary_from'] is None:
-        predicted_salary = ml_models.predict_salary(pd.DataFrame([features_salary]))
-        vacancy['predicted_salary'] = round(predicted_salary, -2).astype(int)
+    return vacancy, features
+
+
+def extract_vacancies(items: List[Dict[str, Any]]) -> List[tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Разбирает пачку вакансий и помечает каждую отпечатком признаков для кэша предсказаний."""
+    parsed = [parse_vacancy(item) for item in items]
+    for vacancy, features in parsed:
+        vacancy['fingerprint'] = feature_fingerprint(features)
+    return parsed
+
+
+def predict_vacancies(parsed: List[tuple[Dict[str, Any], Dict[str, Any]]], version: str | None = None,
+                      known: Dict[str, Prediction] | None = None) -> List[Dict[str, Any]]:
+    """Оценивает грейд и зарплату одним вызовом модели на батч.
+
+    Предсказания берутся из known (найдены в БД для версии моделей version) или из кэша
+    воркера; CatBoost считает только то, чего там нет.
+    """
+    ml_models = get_models()
+    model_version = ml_models.version
+    if version != model_version:
+        # known посчитан для других файлов моделей — не используем
+        known = None
+    known = known or {}
+
+    vacancies = [vacancy for vacancy, _ in parsed]
+    features = [feature for _, feature in parsed]
+    predictions = [
+        known.get(vacancy['fingerprint']) or _predictions.get(model_version, vacancy['fingerprint'])
+        for vacancy in vacancies
+    ]
+
+    to_grade = [i for i, prediction in enumerate(predictions) if prediction is None]
+    if to_grade:
+        grades = ml_models.predict_grade_batch([features[i] for i in to_grade])
+        for i, grade in zip(to_grade, grades):
+            predictions[i] = (grade, None)
+    for vacancy, feature, (grade, _) in zip(vacancies, features, predictions):
+        vacancy['grade'] = grade
+        feature['grade'] = grade
+
+    # зарплату предсказываем только там, где она не указана
+    to_predict = [i for i, vacancy in enumerate(vacancies)
+                  if vacancy['salary_from'] is None and predictions[i][1] is None]
+    if to_predict:
+        salaries = ml_models.predict_salary_batch([features[i] for i in to_predict])
+        for i, predicted_salary in zip(to_predict, salaries):
+            predictions[i] = (predictions[i][0], int(round(predicted_salary, -2)))
+
+    logger.debug(f"[ML] Батч {len(vacancies)}: моделью оценено грейдов {len(to_grade)}, "
+                 f"зарплат {len(to_predict)}")
+
+    for vacancy, prediction in zip(vacancies, predictions):
+        if vacancy['salary_from'] is None:
+            vacancy['predicted_salary'] = prediction[1]
+        vacancy['model_version'] = model_version
+        _predictions.set(model_version, vacancy['fingerprint'], prediction)
+        # карточка для рассылки рисуется один раз при загрузке и хранится вместе с вакансией
+        vacancy['card'] = format_vacancy(vacancy)
 
-    return vacancy
\ No newline at end of file
+    return vacancies
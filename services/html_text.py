@@ -0,0 +1,64 @@
+from html.entities import html5
+from html.parser import HTMLParser
+
+# содержимое этих тегов BeautifulSoup.get_text() не возвращает
+_SKIP_TAGS = frozenset({'script', 'style', 'template'})
+
+
+class _TextExtractor(HTMLParser):
+    """Потоковый токенизатор: собирает текстовые узлы, не строя дерево документа."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.parts: list[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+    def handle_entityref(self, name):
+        # неизвестная сущность остаётся в тексте как «&name», как у BeautifulSoup
+        self.handle_data(html5.get(f'{name};', f'&{name}'))
+
+    def handle_charref(self, name):
+        code = int(name[1:], 16) if name[:1] in ('x', 'X') else int(name)
+        char = None
+        if code < 256:
+            # &#150; и подобные на практике означают символы windows-1252
+            try:
+                char = bytes([code]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not char:
+            try:
+                char = chr(code)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(char or '\N{REPLACEMENT CHARACTER}')
+
+    def unknown_decl(self, data):
+        # <![CDATA[...]]> попадает в текст, как и у BeautifulSoup
+        if data.startswith('CDATA[') and not self._skip_depth:
+            self.parts.append(data[len('CDATA['):])
+
+
+def html_to_text(html: str) -> str:
+    """Текст HTML-описания вакансии.
+
+    Результат совпадает с BeautifulSoup(html, 'html.parser').get_text(): на таком тексте
+    обучались текстовые признаки CatBoost, поэтому пробелы и переводы строк не нормализуются,
+    а сущности (&nbsp;, &amp; и т.п.) раскрываются так же.
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return ''.join(parser.parts)
@@ -0,0 +1,141 @@
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Mapping
+from urllib.parse import urlencode
+from services.cache import LRUCache
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+@dataclass
+class CachedResponse:
+    data: Any
+    etag: str | None = None
+    last_modified: str | None = None
+    expires_at: float = 0.0   # unix-время, до которого ответ считается свежим
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def validators(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def response_ttl(headers: Mapping[str, str], default: float) -> float | None:
+    """TTL по Cache-Control; None — ответ кэшировать нельзя."""
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control:
+        return None
+    if 'no-cache' in cache_control:
+        return 0.0
+    match = _MAX_AGE.search(cache_control)
+    return float(match.group(1)) if match else default
+
+
+class HttpCache:
+    """Кэш ответов HH: LRU в памяти и, опционально, JSON-файлы на диске.
+
+    Ключ — URL и параметры запроса. Устаревшие записи с ETag/Last-Modified не выбрасываются,
+    а используются для условного запроса (304 Not Modified).
+
+    Дисковый кэш ограничен disk_max_entries файлами: время изменения файла — срок свежести
+    записи, и раз в disk_max_entries / 10 записей истёкшие файлы удаляются, а при превышении
+    лимита — ещё и ближайшие к истечению.
+    """
+
+    def __init__(self, maxsize: int, disk_dir: str | None = None, disk_max_entries: int = 10000):
+        self.memory = LRUCache(maxsize)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self.disk_max_entries = disk_max_entries
+        # первая запись на диск сразу чистит то, что осталось от прошлого запуска
+        self._cleanup_every = max(100, disk_max_entries // 10)
+        self._writes_since_cleanup = self._cleanup_every
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    @staticmethod
+    def key(url: str, params: Mapping[str, Any] | None = None) -> str:
+        query = urlencode(sorted((params or {}).items()), doseq=True)
+        return hashlib.sha1(f'{url}?{query}'.encode()).hexdigest()
+
+    async def get(self, key: str) -> CachedResponse | None:
+        entry = self.memory.get(key)
+        if entry is None and self.disk_dir:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None:
+                self.memory.set(key, entry)
+        return entry
+
+    async def set(self, key: str, entry: CachedResponse, persist: bool = True):
+        """persist=False — только в память (страницы поиска живут секунды, на диске они мусор)."""
+        self.memory.set(key, entry)
+        if self.disk_dir and persist:
+            self._writes_since_cleanup += 1
+            cleanup = self._writes_since_cleanup >= self._cleanup_every
+            if cleanup:
+                self._writes_since_cleanup = 0
+            await asyncio.to_thread(self._write_disk, key, entry, cleanup)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'size': len(self.memory),
+        }
+
+    def _read_disk(self, key: str) -> CachedResponse | None:
+        path = self.disk_dir / f'{key}.json'
+        try:
+            return CachedResponse(**json.loads(path.read_text(encoding='utf-8')))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            logger.warning(f"[CACHE] Повреждённая запись {path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, entry: CachedResponse, cleanup: bool = False):
+        path = self.disk_dir / f'{key}.json'
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(asdict(entry), ensure_ascii=False), encoding='utf-8')
+        # срок свежести в mtime: очистке не нужно читать и разбирать каждый файл
+        os.utime(tmp_path, (entry.expires_at, entry.expires_at))
+        tmp_path.replace(path)
+        if cleanup:
+            self._cleanup_disk()
+
+    def _cleanup_disk(self):
+        now = time.time()
+        entries = []
+        for path in self.disk_dir.glob('*.json'):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        live = [(expires_at, path) for expires_at, path in entries if expires_at > now]
+        live.sort()
+        evict = [path for expires_at, path in entries if expires_at <= now]
+        evict += [path for _, path in live[:max(0, len(live) - self.disk_max_entries)]]
+        for path in evict:
+            path.unlink(missing_ok=True)
+        if evict:
+            logger.info(f"[CACHE] Удалено с диска {len(evict)} записей, осталось "
+                        f"{len(entries) - len(evict)}")
@@ -0,0 +1,142 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+from config.config import PipelineConfig
+from database.database import Database
+from services.dedup import VacancyDeduplicator
+from services.formatter import render_card
+from services.hh_parser import HHClient, fetch_hh_ids, fetch_vacancy
+from services.latest import LatestVacancies
+from services.metrics import PIPELINE_PROCESSED, PIPELINE_QUEUE_DEPTH
+from services.pipeline import Pipeline, Stage
+from services.profiles import DEFAULT_PROFILE
+from services.processing import VacancyProcessor
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ключ advisory-блокировки Postgres: загрузку выполняет один экземпляр бота за раз
+INGEST_LOCK_KEY = 0x68685f696e676573  # b'hh_inges'
+
+# сколько карточек новых вакансий run_once возвращает вызывающему (команда «начать»)
+SUMMARY_CARDS = 20
+
+
+@dataclass
+class IngestSummary:
+    """Итог одной загрузки: сами вакансии в памяти не копятся, сколько бы их ни пришло."""
+    inserted: int = 0                                # сохранено новых вакансий
+    cards: list[str] = field(default_factory=list)  # карточки первых SUMMARY_CARDS из них
+
+
+class VacancyIngestor:
+    """Единственный поставщик вакансий: раз в тик забирает новые вакансии с HH и пишет их в БД.
+
+    Рассылка пользователям только читает то, что уже сохранено, поэтому нагрузка
+    на HH и на модели не зависит от числа подписчиков.
+
+    Загрузка — конвейер (services.pipeline): поиск ID → карточки с HH → разбор HTML →
+    модели → запись в БД. Стадии работают одновременно и связаны ограниченными очередями.
+    """
+
+    def __init__(self, db: Database, hh: HHClient, processor: VacancyProcessor,
+                 interval: int, batch_size: int, config: PipelineConfig,
+                 latest: LatestVacancies | None = None):
+        self.db = db
+        self.hh = hh
+        self.processor = processor
+        self.dedup = VacancyDeduplicator(db)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.config = config
+        self.latest = latest
+        self.is_running = True
+        self._lock = asyncio.Lock()
+        self._summary = IngestSummary()
+        self.pipeline = self._create_pipeline()
+        PIPELINE_PROCESSED.set_function(lambda: self._stage_samples('processed'))
+        PIPELINE_QUEUE_DEPTH.set_function(lambda: self._stage_samples('queue_depth'))
+
+    def _create_pipeline(self) -> Pipeline:
+        config = self.config
+        items_queue = config.queue_size * self.batch_size
+        return Pipeline('ingest', [
+            Stage('fetch', self._fetch, workers=config.fetch_workers, queue_size=items_queue),
+            Stage('extract', self.processor.extract, workers=config.extract_workers,
+                  queue_size=items_queue, batch_size=self.batch_size, linger=config.linger),
+            Stage('score', self.processor.predict, workers=config.score_workers,
+                  queue_size=config.queue_size),
+            # запись строго в один поток: ingest_seq должен становиться видимым по возрастанию,
+            # иначе курсор доставки может перескочить ещё не закоммиченные вакансии
+            Stage('store', self._store, workers=1, queue_size=config.queue_size),
+        ])
+
+    def _stage_samples(self, field: str):
+        return [({'stage': stats['stage']}, stats[field]) for stats in self.pipeline.stats()]
+
+    async def start(self):
+        while self.is_running:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> IngestSummary:
+        # Параллельные вызовы (тик + команда «начать», другие экземпляры) не дублируют запросы к HH
+        async with self._lock:
+            try:
+                async with self.db.advisory_lock(INGEST_LOCK_KEY) as locked:
+                    if not locked:
+                        logger.info("[INGEST] Загрузку уже выполняет другой экземпляр, пропускаем тик")
+                        return IngestSummary()
+                    return await self._ingest()
+            except Exception as e:
+                logger.error(f"[INGEST] Ошибка при обновлении вакансий: {e}", exc_info=True)
+                return IngestSummary()
+
+    async def _ingest(self) -> IngestSummary:
+        self.pipeline = self._create_pipeline()
+        # запись — последняя стадия конвейера, она же и заполняет итог
+        summary = self._summary = IngestSummary()
+        await self.pipeline.run(self._discover())
+        logger.info(f"[INGEST] Сохранено новых вакансий: {summary.inserted}, кэш HH: {self.hh.cache.stats()}")
+        return summary
+
+    async def _discover(self) -> AsyncIterator[str]:
+        """ID новых вакансий: отдаются по мере ответа каждого поискового запроса."""
+        last_published = await self.db.get_last_published_time()
+        logger.info(f"[INGEST] Запрашиваем вакансии с {last_published}")
+
+        # один запрос к HH на каждый уникальный поисковый запрос среди профилей пользователей
+        profiles = {DEFAULT_PROFILE.query_key: DEFAULT_PROFILE}
+        for profile in await self.db.get_search_profiles():
+            profiles.setdefault(profile.query_key, profile)
+
+        async def search(query_key, profile):
+            return query_key, await fetch_hh_ids(self.hh, date_from=last_published,
+                                                 search=profile.search_params())
+
+        queued = set()
+        for future in asyncio.as_completed([search(key, profile) for key, profile in profiles.items()]):
+            query_key, ids = await future
+            # оба запроса по одному ответу HH идут через одно соединение, без второго acquire
+            async with self.db.connection():
+                # связи «вакансия — запрос» пишем до самих вакансий, чтобы рассылка сразу видела их
+                await self.db.insert_vacancy_queries([(vac_id, query_key) for vac_id in ids])
+                new_ids = await self.dedup.filter_new([vac_id for vac_id in ids if vac_id not in queued])
+            logger.info(f"[INGEST] Запрос {query_key}: найдено ID {len(ids)}, новых {len(new_ids)}")
+            for vac_id in new_ids:
+                queued.add(vac_id)
+                yield vac_id
+
+    async def _fetch(self, vac_id: str) -> dict | None:
+        return await fetch_vacancy(self.hh, vac_id)
+
+    async def _store(self, processed: list[dict]) -> list[dict]:
+        inserted_ids = await self.db.insert_vacancies_bulk(processed)
+        self.dedup.mark_seen(vacancy['id'] for vacancy in processed)
+        inserted = [vacancy for vacancy in processed if str(vacancy['id']) in inserted_ids]
+        cards = [render_card(vacancy) for vacancy in inserted]
+        if self.latest is not None:
+            self.latest.add(inserted)
+        self._summary.inserted += len(inserted)
+        self._summary.cards.extend(cards[:SUMMARY_CARDS - len(self._summary.cards)])
+        return inserted
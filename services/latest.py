@@ -0,0 +1,69 @@
+import asyncio
+from database.database import Database
+from services.formatter import render_card
+from services.sender import pack_messages
+import heapq
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LatestVacancies:
+    """Последние size вакансий по published_at с готовыми сообщениями для команды «да».
+
+    Загрузка добавляет сюда каждую сохранённую пачку, так что ответ не ходит в БД.
+    Из БД буфер читается только при первом обращении и раз в refresh_interval секунд
+    в фоне — на случай, если загрузку выполняет другой экземпляр бота.
+    """
+
+    def __init__(self, db: Database, size: int = 10, per_message: int = 5,
+                 refresh_interval: float = 300.0):
+        self.db = db
+        self.size = size
+        self.per_message = per_message
+        self.refresh_interval = refresh_interval
+        # (published_at, id, карточка), от новых к старым
+        self._items: list[tuple] = []
+        self._messages: list[str] | None = None
+        self._loaded_at: float | None = None
+        self._refresh: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    def add(self, vacancies):
+        """Вливает новые вакансии; старые вытесняются, если не попадают в последние size."""
+        known = {vac_id for _, vac_id, _ in self._items}
+        fresh = [
+            (vacancy['published_at'], int(vacancy['id']), render_card(vacancy))
+            for vacancy in vacancies
+            if vacancy.get('published_at') is not None and int(vacancy['id']) not in known
+        ]
+        if not fresh:
+            return
+        self._items = heapq.nlargest(self.size, self._items + fresh, key=lambda item: item[:2])
+        self._messages = None
+
+    async def messages(self) -> list[str]:
+        if self._loaded_at is None:
+            # холодный старт: всплеск запросов ждёт одно чтение из БД
+            async with self._lock:
+                if self._loaded_at is None:
+                    await self._load()
+        elif time.monotonic() - self._loaded_at > self.refresh_interval and self._refresh is None:
+            # отвечаем тем, что есть, а буфер обновляем в фоне
+            self._refresh = asyncio.create_task(self._load())
+        if self._messages is None:
+            self._messages = pack_messages([card for _, _, card in self._items],
+                                           self.per_message, separator='\n')
+        return self._messages
+
+    async def _load(self):
+        try:
+            self.add(await self.db.get_recent_vacancies(self.size))
+            self._loaded_at = time.monotonic()
+        except Exception as e:
+            logger.warning(f"[LATEST] Не удалось прочитать последние вакансии из БД: {e}")
+            if self._loaded_at is None and not self._items:
+                raise
+        finally:
+            self._refresh = None
@@ -0,0 +1,194 @@
+from bisect import bisect_left
+from collections import defaultdict
+from functools import wraps
+from typing import Callable, Iterable
+from aiohttp import web
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# границы по умолчанию, сек: от миллисекунды до полуминуты
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict[tuple, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels):
+        self._values[tuple(str(labels[name]) for name in self.labels)] += amount
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Histogram:
+    """Гистограмма задержек: накопительные корзины, сумма и число наблюдений."""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = buckets
+        # на каждый набор меток: счётчики корзин (+Inf последней), сумма
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = defaultdict(float)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def timed(self, **labels) -> Callable:
+        """Декоратор корутины: наблюдает время её выполнения, в том числе при исключении."""
+        def decorator(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, **labels)
+            return wrapper
+        return decorator
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {self._sums[key]}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {cumulative}')
+        return lines
+
+
+class Gauge:
+    """Значение, которое считывается в момент запроса /metrics из callback."""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._callbacks: list[Callable[[], Iterable[tuple[dict, float]]]] = []
+
+    def set_function(self, callback: Callable[[], Iterable[tuple[dict, float]]]):
+        # callback возвращает пары (метки, значение)
+        self._callbacks.append(callback)
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        for callback in self._callbacks:
+            try:
+                samples = list(callback())
+            except Exception as e:
+                logger.warning(f"[METRICS] Не удалось снять {self.name}: {e}")
+                continue
+            for labels, value in samples:
+                key = tuple(str(labels[name]) for name in self.labels)
+                lines.append(f'{self.name}{_format_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self._metrics for line in metric.render()) + '\n'
+
+
+REGISTRY = Registry()
+
+HH_REQUESTS = REGISTRY.register(Counter(
+    'hh_requests_total', 'Запросы к api.hh.ru по результату', ['endpoint', 'result']))
+HH_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'hh_request_seconds', 'Время HTTP-запроса к api.hh.ru, включая ожидание лимита', ['endpoint']))
+PROCESS_SECONDS = REGISTRY.register(Histogram(
+    'vacancy_process_seconds', 'Время разбора и оценки батча вакансий в пуле', ['step']))
+MODEL_PREDICT_SECONDS = REGISTRY.register(Histogram(
+    'model_predict_seconds', 'Время одного вызова модели CatBoost на батч', ['model']))
+MODEL_PREDICT_ROWS = REGISTRY.register(Counter(
+    'model_predict_rows_total', 'Строк, оценённых моделью', ['model']))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    'db_query_seconds', 'Время запросов к Postgres по методам Database', ['query']))
+DB_CONNECTION_ERRORS = REGISTRY.register(Counter(
+    'db_connection_errors_total', 'Обрывы соединения и отказы подключения к Postgres', ['query']))
+DB_CIRCUIT_OPEN = REGISTRY.register(Gauge(
+    'db_circuit_open', '1, если запросы к Postgres отклоняются предохранителем'))
+TG_MESSAGES = REGISTRY.register(Counter(
+    'telegram_messages_total', 'Сообщения в Telegram по результату отправки', ['result']))
+TG_SEND_SECONDS = REGISTRY.register(Histogram(
+    'telegram_send_seconds', 'Время вызова send_message'))
+PIPELINE_PROCESSED = REGISTRY.register(Gauge(
+    'ingest_stage_processed', 'Элементов, прошедших стадию загрузки в текущем прогоне', ['stage']))
+PIPELINE_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'ingest_stage_queue_depth', 'Заполненность входной очереди стадии загрузки', ['stage']))
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=REGISTRY.render(), content_type='text/plain', charset='utf-8')
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Отдаёт метрики в формате Prometheus на http://host:port/metrics."""
+    app = web.Application()
+    app.router.add_get('/metrics', _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"[METRICS] Метрики доступны на http://{host}:{port}/metrics")
+    return runner
+
+
+class LogSampler:
+    """Пропускает в лог одно сообщение на ключ за interval секунд, остальные только считает.
+
+    Повторяющиеся события (ретраи HH, лимиты Telegram по чатам) иначе пишутся на каждый
+    запрос и сами становятся нагрузкой.
+    """
+
+    def __init__(self, interval: float = 60.0):
+        self.interval = interval
+        self._last: dict[str, float] = {}
+        self._suppressed: dict[str, int] = defaultdict(int)
+
+    def allow(self, key: str) -> int | None:
+        """None — сообщение не писать; иначе число подавленных с прошлого раза."""
+        now = time.monotonic()
+        if now - self._last.get(key, -self.interval) < self.interval:
+            self._suppressed[key] += 1
+            return None
+        self._last[key] = now
+        return self._suppressed.pop(key, 0)
+
+    def log(self, log: logging.Logger, level: int, key: str, message: str):
+        suppressed = self.allow(key)
+        if suppressed:
+            log.log(level, f"{message} (похожих сообщений пропущено: {suppressed})")
+        elif suppressed is not None:
+            log.log(level, message)
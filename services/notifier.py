@@ -1,142 +1,208 @@
 import asyncio
-import aiohttp
 from aiogram import Bot
+from collections import defaultdict
+from config.config import NotifierConfig
+from contextlib import suppress
 from database.database import Database
+from database.queries import USERS_CHANGED_CHANNEL
 from datetime import datetime, timezone
-from services.hh_parser import fetch_hh_ids, fetch_vacancy, process_vacancy
+from services.formatter import render_card
+from services.profiles import SearchProfile
+from services.scheduler import UserScheduler
+from services.sender import MessageSender, pack_messages
 import logging
 
 logger = logging.getLogger(__name__)
 
+# пауза перед повторным LISTEN после потери соединения, сек
+LISTEN_RETRY_DELAY = 5.0
+
+
 class VacancyNotifier:
-    def __init__(self, bot: Bot, db: Database):
+    """Рассылка новых вакансий подписчикам по расписанию.
+
+    Экземпляров может быть несколько: каждый планирует всех пользователей, но рассылает
+    только тех, кого успел взять в аренду (Database.claim_users). Берёт порциями,
+    так что созревших пользователей разбирают все экземпляры одновременно.
+    Подписки, отписки и смена интервала через другие экземпляры приходят по LISTEN
+    на канал users_changed; после переподключения расписание сверяется с users целиком.
+    """
+
+    def __init__(self, bot: Bot, db: Database, sender: MessageSender,
+                 config: NotifierConfig, owner: str):
         self.bot = bot
         self.db = db
-        self.is_running = True
+        self.sender = sender
+        self.config = config
+        self.owner = owner
+        self.vacancies_per_message = config.vacancies_per_message
+        self.scheduler = UserScheduler(self.notify_users, config.max_parallel)
+        # общий на все порции и группы: одновременно обрабатываются не больше max_parallel пользователей
+        self._user_slots = asyncio.Semaphore(config.max_parallel)
+        # chat_id -> (время проверки, курсор): копятся за цикл и пишутся одним UPDATE
+        self._pending: dict[int, tuple[datetime, int | None]] = {}
+        self._flush_lock = asyncio.Lock()
 
     async def start(self):
-        while self.is_running:
+        try:
+            # после рестарта восстанавливаем расписание из таблицы users
+            self.scheduler.load(await self.db.get_all_users())
+        except Exception as e:
+            logger.error("[NOTIFIER] Не удалось загрузить пользователей", exc_info=True)
+        asyncio.create_task(self._listen())
+        if self.config.resync_interval:
+            asyncio.create_task(self._resync())
+        await self.scheduler.start()
+
+    async def _listen(self):
+        while True:
             try:
-                users = await self.db.get_all_users()
-                
-                for user in users:
-                    chat_id = user['chat_id']
-                    last_check = user['last_check']
-                    interval = user['update_interval']
-
-                    # Приводим last_check к aware формату
-                    if last_check.tzinfo is None:
-                        last_check = last_check.replace(tzinfo=timezone.utc)
-
-                    now = datetime.now(timezone.utc)
-
-                    if (now - last_check).total_seconds() >= interval * 60:
-                        await self.check_and_notify(user)
-
-                    await asyncio.sleep(5)  
-
-                await asyncio.sleep(60)  
-
+                async with self.db.listen(USERS_CHANGED_CHANNEL, self._on_user_changed) as closed:
+                    # пока соединения не было, уведомления терялись — сверяемся с таблицей целиком
+                    await self._sync_all()
+                    await closed.wait()
+                logger.warning("[NOTIFIER] Соединение LISTEN потеряно, переподключаемся")
             except Exception as e:
-                logger.error("[NOTIFIER] Ошибка в основном цикле", exc_info=True)
-    
-    async def update_vacancies_from_api(self):
-        try:
-            last_published = await self.db.get_last_published_time()
-            logger.info(f"[FETCH] Запрашиваем вакансии с {last_published}")
-
-            async with aiohttp.ClientSession() as session:
-                new_ids = await fetch_hh_ids(session, date_from=last_published)
-                existing_ids = await self.db.get_existing_ids()
-                ids_to_process = [id for id in new_ids if id not in existing_ids]
+                logger.error(f"[NOTIFIER] Не удалось подписаться на изменения пользователей: {e}")
+            await asyncio.sleep(LISTEN_RETRY_DELAY)
 
-                for vac_id in ids_to_process:
-                    raw_vacancy = await fetch_vacancy(session, vac_id)
-                    processed = process_vacancy(raw_vacancy)
-                    await self.db.insert_vacancy(processed)
+    def _on_user_changed(self, payload: str):
+        asyncio.create_task(self._refresh_user(int(payload)))
 
+    async def _refresh_user(self, chat_id: int):
+        try:
+            user = await self.db.get_user(chat_id)
         except Exception as e:
-            logger.error(f"[NOTIFIER] Ошибка при обновлении вакансий: {e}", exc_info=True)
-
-    async def check_and_notify(self, user):
-        
-        chat_id = user['chat_id']
-        last_check = user['last_check']
-        interval = user['update_interval']
-
-        logger.debug(f"[DEBUG] user['last_check']: {last_check}, тип: {type(last_check)}")
-
-        if last_check.tzinfo is None:
-            last_check = last_check.replace(tzinfo=timezone.utc)
-
-        now = datetime.now(timezone.utc)
+            logger.error(f"[NOTIFIER] Не удалось прочитать пользователя {chat_id}: {e}")
+            return
+        if user is None:
+            self.scheduler.remove(chat_id)
+        else:
+            self.scheduler.schedule(chat_id, user['update_interval'], user['last_check'])
 
-        logger.info(f"[NOTIFY] Проверка пользователя {chat_id}:")
-        logger.info(f"  - Интервал: {interval} мин")
-        logger.info(f"  - Последняя проверка: {last_check}")
-        logger.info(f"  - Текущее время: {now}")
-        logger.info(f"  - Прошло времени: {(now - last_check).total_seconds()} сек")
+    async def _sync_all(self):
+        known = self.scheduler.chat_ids()
+        self.scheduler.sync(await self.db.get_all_users(), known)
 
-        if (now - last_check).total_seconds() >= interval * 60:
+    async def _resync(self):
+        # страховка на случай потерянных уведомлений; обычно хватает LISTEN
+        while True:
+            await asyncio.sleep(self.config.resync_interval)
             try:
-                check_start_time = now
-                logger.debug(f"[DEBUG] Фильтруем вакансии с published_at > {last_check}")
-                await self.update_vacancies_from_api()
-                
-                new_vacancies = await self.db.get_new_vacancies(last_check)
-
-                logger.info(f"  - Найдено новых вакансий: {len(new_vacancies)}")
-
-                if new_vacancies:
-                    await self.send_vacancies(chat_id, new_vacancies)
-                await self.update_last_check(chat_id, check_start_time)
+                await self._sync_all()
             except Exception as e:
-                logger.error(f"[NOTIFY] Ошибка при обработке вакансии {e}", exc_info=True)
-
-    async def send_vacancies(self, chat_id: int, vacancies):
-        for vacancy in vacancies:
-            message = self.format_vacancy(vacancy)
+                logger.error(f"[NOTIFIER] Не удалось сверить расписание: {e}")
+
+    async def notify_users(self, chat_ids: list[int]):
+        batch = self.config.claim_batch
+        for start in range(0, len(chat_ids), batch):
+            part = chat_ids[start:start + batch]
+            users = await self.db.claim_users(part, self.owner, self.config.lease_seconds)
+            if len(users) < len(part):
+                logger.debug(f"[NOTIFY] Взято в работу {len(users)} из {len(part)}, "
+                             f"остальных рассылают другие экземпляры")
+            if users:
+                await self.notify_claimed(users)
+
+    async def notify_claimed(self, users):
+        # пользователи с одинаковым курсором получают одни и те же вакансии — один запрос на группу
+        groups = defaultdict(list)
+        for user in users:
+            groups[self._cursor(user)].append(user)
+
+        logger.info(f"[NOTIFY] Пользователей к проверке: {len(users)}, групп по курсору: {len(groups)}")
+        renewal = asyncio.create_task(self._renew_leases([user['chat_id'] for user in users]))
+        try:
+            for last_seq, group in groups.items():
+                await self.notify_group(last_seq, group)
+        finally:
+            # продление останавливаем до flush: он снимает аренду, и продлевать уже нечего
+            renewal.cancel()
+            with suppress(asyncio.CancelledError):
+                await renewal
+            await self.flush()
+
+    async def _renew_leases(self, chat_ids: list[int]):
+        """Продлевает аренду, пока идёт рассылка: иначе долгий цикл отдаст пользователей другим."""
+        while True:
+            await asyncio.sleep(self.config.lease_seconds / 3)
             try:
-                await self.bot.send_message(chat_id, message, parse_mode='HTML')
-                await asyncio.sleep(0.5)
+                await self.db.renew_leases(chat_ids, self.owner, self.config.lease_seconds)
             except Exception as e:
-                logging.error(f"[NOTIFIER] Не удалось отправить вакансию: {e}")
+                logger.warning(f"[NOTIFIER] Не удалось продлить аренду {len(chat_ids)} пользователей: {e}")
+
+    def _cursor(self, user) -> int:
+        # курсор, который ещё не удалось записать в БД, новее того, что в users
+        pending = self._pending.get(user['chat_id'])
+        return max(user['last_seq'] or 0, (pending[1] or 0) if pending else 0)
+
+    async def notify_group(self, last_seq: int, users):
+        check_start_time = datetime.now(timezone.utc)
+        # вакансии уже загружены VacancyIngestor, здесь только чтение из БД
+        new_vacancies = await self.db.get_vacancies_after(last_seq)
+        new_seq = new_vacancies[-1]['ingest_seq'] if new_vacancies else last_seq
+        logger.debug(f"[NOTIFY] Курсор {last_seq}: новых вакансий {len(new_vacancies)}")
+
+        # вакансии фильтруются по профилю в памяти; сообщения собираются один раз
+        # на каждый уникальный профиль и переиспользуются всеми его пользователями
+        by_profile = defaultdict(list)
+        for user in users:
+            by_profile[SearchProfile.from_user(user)].append(user['chat_id'])
+
+        tasks = []
+        for profile, chat_ids in by_profile.items():
+            cards = [render_card(vacancy) for vacancy in new_vacancies if profile.matches(vacancy)]
+            messages = pack_messages(cards, self.vacancies_per_message)
+            tasks.extend(
+                self.check_and_notify(chat_id, messages, new_seq, check_start_time)
+                for chat_id in chat_ids
+            )
+        await asyncio.gather(*tasks)
+
+    async def check_and_notify(self, chat_id: int, messages: list[str], new_seq: int, check_start_time: datetime):
+        async with self._user_slots:
+            try:
+                if messages:
+                    await self.send_vacancies(chat_id, messages)
+                self.update_last_check(chat_id, check_start_time, new_seq)
+            except Exception as e:
+                logger.error(f"[NOTIFY] Ошибка при обработке вакансий для {chat_id}: {e}", exc_info=True)
 
-    def format_vacancy(self, vacancy) -> str:
-        salary_info = ""
-        if vacancy.get("salary_from"):
-            salary_info = f"💵 Зарплата: {vacancy['salary_from']} – {vacancy['salary_to'] or '?'}"
-        else:
-            salary_info = f"💸 Примерная зарплата: {vacancy['predicted_salary']}"
-
-        
-        return (
-            f"🔥 <b>{vacancy['vacancy_name']}</b>\n"
-            f"🏢 {vacancy.get('employer', 'Работодатель не указан')}\n"
-            f"📍 {vacancy.get('city', 'Город не указан')}\n"
-            f"{salary_info}\n"
-            f"🎯 Грейд: {vacancy.get('grade', 'Не определен')}\n"
-            f"🔗 <a href='{vacancy.get('url', '#')}'>Подробнее</a>"
-        )
-
-    async def update_last_check(self, chat_id: int, new_time=None):
+    async def send_vacancies(self, chat_id: int, messages: list[str]):
+        sent = await self.sender.send(chat_id, messages)
+        if sent < len(messages):
+            logger.error(f"[NOTIFIER] В чат {chat_id} доставлено {sent} из {len(messages)} сообщений")
+
+    def update_last_check(self, chat_id: int, new_time=None, last_seq: int | None = None):
+        """Запоминает проверку пользователя; в БД она попадёт при ближайшем flush()."""
         if new_time is None:
             new_time = datetime.now(timezone.utc)
-        
-        try:
-            async with self.db.pool.acquire() as conn:
-                await conn.execute(
-                    'UPDATE users SET last_check = $1 WHERE chat_id = $2',
-                    new_time,
-                    chat_id
-                )
-        except (asyncpg.exceptions.ConnectionDoesNotExistError,
-                asyncpg.exceptions.ConnectionClosedError) as e:
-            logger.error(f"[NOTIFIER] Соединение потеряно: {e}")
-            await self.db.connect()
-            async with self.db.pool.acquire() as conn:
-                await conn.execute(
-                    'UPDATE users SET last_check = $1 WHERE chat_id = $2',
-                    new_time,
-                    chat_id
-                )
\ No newline at end of file
+        pending = self._pending.get(chat_id)
+        if pending is not None:
+            # несколько записей одного пользователя до flush схлопываются в самую свежую
+            new_time = max(new_time, pending[0])
+            last_seq = max((seq for seq in (last_seq, pending[1]) if seq is not None), default=None)
+        self._pending[chat_id] = (new_time, last_seq)
+
+    async def flush(self):
+        """Пишет накопленные проверки одним запросом.
+
+        Курсор сдвигается только после доставки, поэтому при падении бота до flush
+        пользователь получит вакансии последнего цикла повторно, но не пропустит их.
+        Если запись не удалась, состояние остаётся в памяти до следующего flush.
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            states, self._pending = self._pending, {}
+            try:
+                await self.db.update_users_state(states, self.owner)
+            except Exception as e:
+                logger.error(f"[NOTIFIER] Не удалось записать состояние {len(states)} пользователей: {e}")
+                for chat_id, (new_time, last_seq) in states.items():
+                    self.update_last_check(chat_id, new_time, last_seq)
+                return
+            logger.debug(f"[NOTIFIER] Записано состояние {len(states)} пользователей")
+
+    async def close(self):
+        await self.flush()
@@ -0,0 +1,149 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, Awaitable, Callable
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    processed: int = 0       # элементов на входе стадии, включая ошибки
+    emitted: int = 0         # элементов на выходе, пачка считается по длине
+    errors: int = 0
+    busy_seconds: float = 0.0
+
+
+class Stage:
+    """Стадия конвейера: workers корутин читают из ограниченной входной очереди.
+
+    При batch_size > 1 handler получает список: воркер добирает элементы, пока пачка
+    не заполнится или пока не истечёт linger секунд ожидания. None из handler дальше не идёт.
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], workers: int = 1,
+                 queue_size: int = 100, batch_size: int = 1, linger: float = 0.0):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.linger = linger
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.stats = StageStats()
+
+    async def take(self) -> tuple[list, bool]:
+        item = await self.queue.get()
+        if item is _DONE:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            if self.queue.empty():
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self.queue.get_nowait()
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+
+class Pipeline:
+    """Стадии, соединённые ограниченными очередями.
+
+    Медленная стадия заполняет свою входную очередь, и предыдущая стадия ждёт на put(),
+    поэтому в памяти одновременно не больше суммы размеров очередей — даже на большом бэкфилле.
+    Последняя стадия — сток: её результаты только считаются, сохранять их должен сам handler.
+    """
+
+    def __init__(self, name: str, stages: list[Stage], report_interval: float = 30.0):
+        self.name = name
+        self.stages = stages
+        self.report_interval = report_interval
+        self._started = time.monotonic()
+
+    async def run(self, source: AsyncIterable):
+        """Прогоняет элементы source через все стадии."""
+        self._started = time.monotonic()
+        workers = [
+            [asyncio.create_task(self._work(stage, next_stage)) for _ in range(stage.workers)]
+            for stage, next_stage in zip(self.stages, self.stages[1:] + [None])
+        ]
+        reporter = asyncio.create_task(self._report())
+        try:
+            first = self.stages[0]
+            async for item in source:
+                await first.queue.put(item)
+            # стадия завершена — закрываем вход следующей по одному маркеру на воркер
+            for stage, stage_workers, next_stage in zip(self.stages, workers, self.stages[1:] + [None]):
+                if stage is first:
+                    for _ in range(stage.workers):
+                        await stage.queue.put(_DONE)
+                await asyncio.gather(*stage_workers)
+                if next_stage is not None:
+                    for _ in range(next_stage.workers):
+                        await next_stage.queue.put(_DONE)
+        finally:
+            reporter.cancel()
+            for task in (task for stage_workers in workers for task in stage_workers):
+                task.cancel()
+        logger.info(f"[PIPELINE] {self.name} завершён: {self.describe()}")
+
+    async def _work(self, stage: Stage, next_stage: Stage | None):
+        while True:
+            batch, done = await stage.take()
+            if batch:
+                started = time.perf_counter()
+                try:
+                    output = await stage.handler(batch if stage.batch_size > 1 else batch[0])
+                except Exception as e:
+                    stage.stats.errors += len(batch)
+                    logger.error(f"[PIPELINE] {self.name}/{stage.name}: ошибка на {len(batch)} элементах: {e}",
+                                 exc_info=True)
+                    output = None
+                stage.stats.busy_seconds += time.perf_counter() - started
+                stage.stats.processed += len(batch)
+                if output is not None:
+                    stage.stats.emitted += len(output) if isinstance(output, list) else 1
+                    if next_stage is not None:
+                        await next_stage.queue.put(output)
+            if done:
+                return
+
+    def stats(self) -> list[dict[str, Any]]:
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return [
+            {
+                'stage': stage.name,
+                'processed': stage.stats.processed,
+                'emitted': stage.stats.emitted,
+                'errors': stage.stats.errors,
+                'per_second': stage.stats.processed / elapsed,
+                'busy_seconds': stage.stats.busy_seconds,
+                'queue_depth': stage.queue.qsize(),
+                'queue_size': stage.queue_size,
+            }
+            for stage in self.stages
+        ]
+
+    def describe(self) -> str:
+        return '; '.join(
+            f"{s['stage']}: {s['processed']} ({s['per_second']:.1f}/с, ошибок {s['errors']}), "
+            f"очередь {s['queue_depth']}/{s['queue_size']}"
+            for s in self.stats()
+        )
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            logger.info(f"[PIPELINE] {self.name}: {self.describe()}")
@@ -0,0 +1,46 @@
+from services.cache import LRUCache
+import hashlib
+import json
+import threading
+
+# признаки, от которых зависят предсказания; грейд выводится из остальных,
+# поэтому отпечаток входа однозначно определяет и грейд, и зарплату
+FINGERPRINT_FEATURES = ('vacancy_name', 'schedule', 'experience', 'salary_to',
+                        'key_skills', 'description')
+
+# (грейд, округлённая зарплата или None, если её не предсказывали)
+Prediction = tuple[str, int | None]
+
+
+def feature_fingerprint(features: dict) -> str:
+    raw = json.dumps([features.get(name) for name in FINGERPRINT_FEATURES], ensure_ascii=False)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class PredictionCache:
+    """Предсказания моделей по отпечатку признаков.
+
+    Перепубликованные и повторно обработанные вакансии не прогоняются через CatBoost заново.
+    Ключ включает версию моделей, так что после замены .cbm старые записи просто не находятся
+    и вытесняются LRU. Потокобезопасен: с ML_EXECUTOR=thread кэш общий для всех воркеров.
+    """
+
+    def __init__(self, maxsize: int):
+        self._cache = LRUCache(maxsize)
+        # OrderedDict не переживает одновременные move_to_end/popitem из разных потоков
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version: str, fingerprint: str) -> Prediction | None:
+        with self._lock:
+            prediction = self._cache.get((version, fingerprint))
+            if prediction is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return prediction
+
+    def set(self, version: str, fingerprint: str, prediction: Prediction):
+        with self._lock:
+            self._cache.set((version, fingerprint), prediction)
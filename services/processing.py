@@ -0,0 +1,185 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from config.config import MlConfig
+from database.database import Database
+from models.ml_models import (MlModels, ModelSelection, configure_models, discover_models,
+                              get_models, install_models, read_selection)
+from services.hh_parser import extract_vacancies, predict_vacancies
+from services.metrics import MODEL_PREDICT_ROWS, MODEL_PREDICT_SECONDS, PROCESS_SECONDS
+import logging
+import multiprocessing
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class VacancyProcessor:
+    """Разбор HTML и предсказания моделей в пуле процессов/потоков, вне event loop.
+
+    Модели загружаются лениво, при первом предсказании. start() прогревает их в фоне:
+    грузит в основном процессе и только потом форкает воркеры, так что они наследуют
+    готовые модели вместо загрузки своей копии. Пока прогрев не закончен, вызовы ждут.
+    Разбор (extract) и оценка (predict) — отдельные вызовы, чтобы конвейер загрузки
+    мог задавать им свою параллельность.
+
+    Версии моделей задаются в конфиге (ModelSelection), файл выбора (ML_SELECTION_FILE)
+    переопределяет их. Если файлы активных моделей поменялись на диске или в файле выбора
+    указаны другие модели, фоновая проверка загружает их в потоке и подменяет пул воркеров
+    новым; батчи, уже отданные старому пулу, дорабатывают на старых моделях.
+
+    Если передана db, предсказания ищутся в таблице ml_predictions до отправки батча
+    на модели и сохраняются после.
+    """
+
+    def __init__(self, config: MlConfig, db: Database | None = None):
+        self.config = config
+        self.db = db
+        self._configured = ModelSelection(config.grade_model, config.salary_model,
+                                          config.shadow_grade_model, config.shadow_salary_model)
+        self.selection = read_selection(config.selection_file, self._configured)
+        self.selection.validate()
+        configure_models(self.selection)
+        self._executor = self._create_executor(config, self.selection)
+        self._warm_up: asyncio.Task | None = None
+        self._version = self.selection.version
+        self._rejected: ModelSelection | None = None
+
+    @staticmethod
+    def _create_executor(config: MlConfig, selection: ModelSelection) -> Executor:
+        if config.executor == 'process':
+            # при fork пул запускает все воркеры разом на первом submit, копируя память родителя
+            context = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+            return ProcessPoolExecutor(max_workers=config.workers,
+                                       mp_context=multiprocessing.get_context(context),
+                                       initializer=configure_models, initargs=(selection,))
+        if config.executor == 'thread':
+            return ThreadPoolExecutor(max_workers=config.workers, thread_name_prefix='ml')
+        raise ValueError(f"Неизвестный тип исполнителя: {config.executor}")
+
+    def start(self):
+        logger.info(f"[ML] Доступные модели: {discover_models()}, активные: {self.selection}")
+        if self.config.preload:
+            self._warm_up = asyncio.create_task(self.warm_up())
+        if self.config.reload_interval:
+            asyncio.create_task(self._watch_models())
+
+    async def warm_up(self):
+        started = time.perf_counter()
+        try:
+            # загрузка моделей блокирующая — в отдельном потоке, бот в это время отвечает
+            await asyncio.to_thread(get_models)
+            if isinstance(self._executor, ProcessPoolExecutor):
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._executor, _worker_model_version)
+        except Exception as e:
+            logger.error(f"[ML] Не удалось прогреть модели: {e}", exc_info=True)
+            return
+        logger.info(f"[ML] Модели прогреты за {time.perf_counter() - started:.2f} с")
+
+    async def _watch_models(self):
+        while True:
+            await asyncio.sleep(self.config.reload_interval)
+            try:
+                selection = await asyncio.to_thread(read_selection, self.config.selection_file,
+                                                    self._configured)
+                if selection != self.selection:
+                    # отклонённый выбор не перепроверяем каждый тик, пока файл не исправят
+                    if selection != self._rejected:
+                        logger.info(f"[ML] Выбор моделей изменён: {selection}")
+                        try:
+                            await self.swap_models(selection)
+                        except ValueError as e:
+                            self._rejected = selection
+                            logger.error(f"[ML] Выбор моделей не применён: {e}")
+                    continue
+                version = await asyncio.to_thread(lambda: self.selection.version)
+                if version != self._version:
+                    await self.swap_models(self.selection)
+            except Exception as e:
+                logger.error(f"[ML] Не удалось перезагрузить модели: {e}", exc_info=True)
+
+    async def swap_models(self, selection: ModelSelection):
+        """Загружает модели в потоке и атомарно переключает на них новые батчи."""
+        started = time.perf_counter()
+        selection.validate()
+        # пока новые модели грузятся, старые продолжают работать
+        models = await asyncio.to_thread(MlModels, selection)
+        install_models(models)
+        self.selection = selection
+        self._version = models.version
+        if isinstance(self._executor, ProcessPoolExecutor):
+            old_executor = self._executor
+            self._executor = self._create_executor(self.config, selection)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, _worker_model_version)
+            old_executor.shutdown(wait=False)
+        logger.info(f"[ML] Переключились на модели {models.version} ({selection}) за "
+                    f"{time.perf_counter() - started:.2f} с")
+
+    @PROCESS_SECONDS.timed(step='extract')
+    async def extract(self, items: list[dict]) -> list[tuple[dict, dict]]:
+        """Разбор HTML и признаки для моделей."""
+        await self._ready()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, extract_vacancies, items)
+
+    @PROCESS_SECONDS.timed(step='predict')
+    async def predict(self, parsed: list[tuple[dict, dict]]) -> list[dict]:
+        """Грейд, зарплата и карточка для уже разобранных вакансий."""
+        await self._ready()
+        # версия считается при загрузке моделей (__init__, swap_models): selection.version
+        # делает os.stat и может перехэшировать файлы — на каждом батче в цикле событий нельзя
+        version = self._version
+        if self.db is None:
+            return await self._predict(parsed, version, None)
+
+        fingerprints = [vacancy['fingerprint'] for vacancy, _ in parsed]
+        try:
+            known = await self.db.get_predictions(version, fingerprints)
+        except Exception as e:
+            logger.warning(f"[ML] Не удалось прочитать сохранённые предсказания: {e}")
+            known = {}
+
+        vacancies = await self._predict(parsed, version, known)
+        logger.debug(f"[ML] Предсказаний из БД: {len(known)} из {len(vacancies)}")
+
+        # сохраняем только новое: отсутствующие в БД отпечатки и впервые посчитанные зарплаты
+        fresh = {}
+        for vacancy in vacancies:
+            stored = known.get(vacancy['fingerprint'])
+            salary = vacancy.get('predicted_salary')
+            if vacancy['model_version'] == version and (stored is None or (stored[1] is None and salary is not None)):
+                fresh[vacancy['fingerprint']] = (vacancy['grade'], salary)
+        try:
+            await self.db.save_predictions(version, fresh)
+        except Exception as e:
+            logger.warning(f"[ML] Не удалось сохранить предсказания: {e}")
+        return vacancies
+
+    async def _predict(self, parsed, version: str, known: dict | None) -> list[dict]:
+        loop = asyncio.get_running_loop()
+        vacancies, timings = await loop.run_in_executor(
+            self._executor, _predict_in_worker, parsed, version, known
+        )
+        # модели считаются в воркерах, поэтому их тайминги возвращаются вместе с результатом
+        for model, rows, seconds in timings:
+            MODEL_PREDICT_SECONDS.observe(seconds, model=model)
+            MODEL_PREDICT_ROWS.inc(rows, model=model)
+        return vacancies
+
+    async def _ready(self):
+        # до конца прогрева пул не трогаем: иначе воркеры форкнутся без моделей
+        if self._warm_up is not None:
+            await self._warm_up
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _worker_model_version() -> str:
+    return get_models().version
+
+
+def _predict_in_worker(parsed, version: str, known: dict | None):
+    vacancies = predict_vacancies(parsed, version, known)
+    return vacancies, get_models().drain_timings()
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+import hashlib
+import json
+
+# общий поисковый запрос; профиль пользователя может переопределить регион и роли
+SEARCH_PARAMS = {
+    'text': ('name:"data analyst" or "аналитик данных" or "data аналитик"'
+            ' or "продуктовый аналитик" or "Data Analyst" or "Data analyst"'
+            ' or "Аналитик данных" or "BI-аналитик" or "bi-аналитик"'
+            ' not "manager" not "QA-инженер" not "Маркетолог|маркетолог" not "DWH|dwh"'),
+    'area': '113',
+    'professional_role': [10, 156, 164],
+}
+
+
+@dataclass(frozen=True)
+class SearchProfile:
+    """Поисковый профиль пользователя. None в поле означает «как в общем поиске / без фильтра»."""
+    area: str | None = None               # Регион HH (area), по умолчанию вся Россия
+    roles: tuple[int, ...] | None = None  # Профессиональные роли HH
+    grade: str | None = None              # Фильтр по предсказанному грейду
+    min_salary: int | None = None         # Минимальная зарплата (указанная или предсказанная)
+
+    @classmethod
+    def from_user(cls, user) -> 'SearchProfile':
+        roles = user.get('roles')
+        return cls(
+            area=user.get('area'),
+            roles=tuple(roles) if roles else None,
+            grade=user.get('grade'),
+            min_salary=user.get('min_salary'),
+        )
+
+    def search_params(self) -> dict:
+        params = dict(SEARCH_PARAMS)
+        if self.area:
+            params['area'] = self.area
+        if self.roles:
+            params['professional_role'] = sorted(self.roles)
+        return params
+
+    @property
+    def query_key(self) -> str:
+        # одинаковые запросы к HH у разных пользователей дают один ключ и выполняются один раз
+        raw = json.dumps(self.search_params(), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+    def matches(self, vacancy) -> bool:
+        # вакансии, загруженные до появления профилей, считаем найденными общим запросом
+        query_keys = vacancy.get('query_keys') or [DEFAULT_PROFILE.query_key]
+        if self.query_key not in query_keys:
+            return False
+        if self.grade and (vacancy.get('grade') or '').lower() != self.grade.lower():
+            return False
+        if self.min_salary:
+            salary = max(vacancy.get('salary_to') or 0, vacancy.get('salary_from') or 0,
+                         vacancy.get('predicted_salary') or 0)
+            if salary < self.min_salary:
+                return False
+        return True
+
+    def describe(self) -> str:
+        return (
+            f"Регион: {self.area or 'вся Россия'}\n"
+            f"Роли: {', '.join(map(str, self.roles)) if self.roles else 'аналитики (по умолчанию)'}\n"
+            f"Грейд: {self.grade or 'любой'}\n"
+            f"Зарплата от: {self.min_salary or 'не важно'}"
+        )
+
+
+DEFAULT_PROFILE = SearchProfile()
@@ -0,0 +1,55 @@
+import asyncio
+from config.config import StorageConfig
+from database.database import Database
+from datetime import datetime, timedelta, timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ключ advisory-блокировки: обслуживание хранилища выполняет один экземпляр за раз
+STORAGE_LOCK_KEY = 0x68685f73746f7265  # b'hh_store'
+
+
+class StorageMaintenance:
+    """Фоновое обслуживание vacancies_hh: держит горячую таблицу маленькой.
+
+    Описания, записанные до появления vacancy_descriptions, переносятся туда порциями;
+    вакансии старше retention_days удаляются или уходят в vacancies_hh_archive.
+    Каждая порция — отдельный короткий запрос, чтобы не держать блокировки на загрузке.
+    """
+
+    def __init__(self, db: Database, config: StorageConfig):
+        self.db = db
+        self.config = config
+        self.is_running = True
+
+    async def start(self):
+        while self.is_running:
+            try:
+                async with self.db.advisory_lock(STORAGE_LOCK_KEY) as locked:
+                    if locked:
+                        await self.run_once()
+            except Exception as e:
+                logger.error(f"[STORAGE] Ошибка обслуживания хранилища: {e}", exc_info=True)
+            await asyncio.sleep(self.config.interval)
+
+    async def run_once(self):
+        moved = await self._drain(lambda: self.db.move_descriptions(self.config.batch_size))
+        expired = 0
+        if self.config.retention_days:
+            published_before = datetime.now(timezone.utc) - timedelta(days=self.config.retention_days)
+            expired = await self._drain(lambda: self.db.expire_vacancies(
+                published_before, self.config.batch_size, self.config.archive))
+        if moved or expired:
+            action = 'в архив' if self.config.archive else 'удалено'
+            logger.info(f"[STORAGE] Перенесено описаний: {moved}, устаревших вакансий {action}: {expired}")
+
+    async def _drain(self, step) -> int:
+        total = 0
+        while True:
+            count = await step()
+            total += count
+            if count < self.config.batch_size:
+                return total
+            # между порциями отдаём соединения и блокировки загрузке
+            await asyncio.sleep(0.1)
@@ -0,0 +1,141 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+import logging
+
+logger = logging.getLogger(__name__)
+
+_IN_PROGRESS = -1.0
+
+
+class UserScheduler:
+    """Очередь пользователей по времени следующей проверки (min-heap).
+
+    Просыпается ровно тогда, когда наступает срок ближайшего пользователя, и передаёт
+    всех «созревших» одним списком в handler (чтобы сгруппировать их запросы к БД).
+    Списки обрабатываются параллельно, но не больше max_parallel за раз.
+    Состояние меняется инкрементально из хендлеров /subscribe, /unsubscribe, /set_interval;
+    после рестарта очередь восстанавливается из таблицы users.
+    """
+
+    def __init__(self, handler: Callable[[list[int]], Awaitable[None]], max_parallel: int):
+        self.handler = handler
+        self.is_running = True
+        self._heap: list[tuple[float, int]] = []
+        # chat_id -> актуальный срок; устаревшие записи в куче просто пропускаются
+        self._due: dict[int, float] = {}
+        self._intervals: dict[int, int] = {}
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(max_parallel)
+
+    def load(self, users):
+        self._heap.clear()
+        self._due.clear()
+        self._intervals.clear()
+        for user in users:
+            self.schedule(user['chat_id'], user['update_interval'], user['last_check'])
+        logger.info(f"[SCHEDULER] Загружено пользователей: {len(self._due)}")
+
+    def schedule(self, chat_id: int, interval: int, last_check: datetime | None = None):
+        if last_check is None:
+            last_check = datetime.now(timezone.utc)
+        if last_check.tzinfo is None:
+            last_check = last_check.replace(tzinfo=timezone.utc)
+
+        self._intervals[chat_id] = interval
+        if self._due.get(chat_id) == _IN_PROGRESS:
+            # пользователь сейчас обрабатывается — перепланируем по завершении
+            return
+        self._push(chat_id, last_check.timestamp() + interval * 60)
+
+    def sync(self, users, known: set[int]):
+        """Сверяет расписание с таблицей users.
+
+        known — пользователи, которые были в расписании до чтения таблицы: удаляются только
+        они, чтобы не потерять подписку, оформленную, пока шёл запрос.
+        """
+        current = set()
+        for user in users:
+            chat_id = user['chat_id']
+            current.add(chat_id)
+            if chat_id not in self._due or self._intervals.get(chat_id) != user['update_interval']:
+                self.schedule(chat_id, user['update_interval'], user['last_check'])
+        removed = known - current
+        for chat_id in removed:
+            self.remove(chat_id)
+        if removed or len(current) != len(known):
+            logger.info(f"[SCHEDULER] Сверка с БД: пользователей {len(current)}, удалено {len(removed)}")
+
+    def chat_ids(self) -> set[int]:
+        return set(self._due)
+
+    def remove(self, chat_id: int):
+        self._due.pop(chat_id, None)
+        self._intervals.pop(chat_id, None)
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def _push(self, chat_id: int, due: float):
+        self._due[chat_id] = due
+        heapq.heappush(self._heap, (due, chat_id))
+        if self._heap[0] == (due, chat_id):
+            self._wakeup.set()
+
+    def _pop_due(self, now: float) -> list[int]:
+        due_users = []
+        while self._heap and self._heap[0][0] <= now:
+            due, chat_id = heapq.heappop(self._heap)
+            if self._due.get(chat_id) != due:
+                continue
+            self._due[chat_id] = _IN_PROGRESS
+            due_users.append(chat_id)
+        return due_users
+
+    async def _wait(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+        timeout = self._heap[0][0] - time.time() if self._heap else None
+        if timeout is not None and timeout <= 0:
+            return
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def start(self):
+        while self.is_running:
+            await self._wait()
+            due_users = self._pop_due(time.time())
+            if due_users:
+                await self._semaphore.acquire()
+                asyncio.create_task(self._run(due_users))
+
+    async def _run(self, chat_ids: list[int]):
+        try:
+            await self.handler(chat_ids)
+        except Exception:
+            logger.error(f"[SCHEDULER] Ошибка при обработке пользователей {chat_ids}", exc_info=True)
+        finally:
+            self._semaphore.release()
+            now = time.time()
+            for chat_id in chat_ids:
+                if self._due.get(chat_id) == _IN_PROGRESS:
+                    self._push(chat_id, now + self._intervals[chat_id] * 60)
+
+
+class NullScheduler:
+    """Расписание для экземпляра без роли notifier: хендлерам есть что вызвать, а очередь не растёт.
+
+    Рассылают другие экземпляры, об изменениях пользователей они узнают по NOTIFY users_changed.
+    """
+
+    def schedule(self, chat_id: int, interval: int, last_check: datetime | None = None):
+        pass
+
+    def remove(self, chat_id: int):
+        pass
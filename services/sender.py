@@ -0,0 +1,117 @@
+import asyncio
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from services.cache import LRUCache
+from services.metrics import TG_MESSAGES, TG_SEND_SECONDS, LogSampler
+from services.rate_limiter import TokenBucket
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+# на массовой рассылке такие события идут сотнями — пишем одно в минуту с числом пропущенных
+_log_sampler = LogSampler(60.0)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def pack_messages(cards: list[str], per_message: int = 5, separator: str = '\n\n') -> list[str]:
+    """Склеивает карточки вакансий в сообщения: не больше per_message штук и 4096 символов."""
+    messages = []
+    current: list[str] = []
+    length = 0
+    for card in cards:
+        extra = len(card) + (len(separator) if current else 0)
+        if current and (len(current) >= per_message or length + extra > TELEGRAM_MESSAGE_LIMIT):
+            messages.append(separator.join(current))
+            current, length = [], 0
+            extra = len(card)
+        current.append(card)
+        length += extra
+    if current:
+        messages.append(separator.join(current))
+    return messages
+
+
+class MessageSender:
+    """Очередь исходящих сообщений с лимитами Telegram: общим (~30/с) и на чат (~1/с).
+
+    Сообщения одного чата отправляются по порядку одним воркером, разные чаты —
+    параллельно несколькими воркерами.
+    """
+
+    def __init__(self, bot: Bot, workers: int, global_rate: float, chat_rate: float,
+                 max_retries: int = 3):
+        self.bot = bot
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._global_bucket = TokenBucket(global_rate)
+        self._chat_buckets = LRUCache(maxsize=10_000)
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+
+    async def send(self, chat_id: int, messages: list[str]) -> int:
+        """Ставит сообщения в очередь и ждёт их доставки; возвращает число отправленных."""
+        if not messages:
+            return 0
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((chat_id, messages, future))
+        return await future
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, capacity=1)
+            self._chat_buckets.set(chat_id, bucket)
+        return bucket
+
+    async def _worker(self):
+        while True:
+            chat_id, messages, future = await self.queue.get()
+            try:
+                sent = await self._deliver(chat_id, messages)
+                if not future.done():
+                    future.set_result(sent)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, chat_id: int, messages: list[str]) -> int:
+        chat_bucket = self._chat_bucket(chat_id)
+        sent = 0
+        for text in messages:
+            for attempt in range(self.max_retries + 1):
+                await chat_bucket.acquire()
+                await self._global_bucket.acquire()
+                started = time.perf_counter()
+                try:
+                    await self.bot.send_message(chat_id, text, parse_mode='HTML')
+                    TG_MESSAGES.inc(result='sent')
+                    sent += 1
+                    break
+                except TelegramRetryAfter as e:
+                    TG_MESSAGES.inc(result='retry_after')
+                    _log_sampler.log(logger, logging.WARNING, 'retry_after',
+                                     f"[SENDER] Чат {chat_id}: RetryAfter {e.retry_after} сек")
+                    chat_bucket.pause(e.retry_after)
+                except TelegramForbiddenError:
+                    TG_MESSAGES.inc(result='forbidden')
+                    _log_sampler.log(logger, logging.INFO, 'forbidden',
+                                     f"[SENDER] Чат {chat_id} недоступен, пропускаем сообщения")
+                    return sent
+                except Exception as e:
+                    TG_MESSAGES.inc(result='error')
+                    logger.error(f"[SENDER] Не удалось отправить сообщение в чат {chat_id}: {e}")
+                    break
+                finally:
+                    TG_SEND_SECONDS.observe(time.perf_counter() - started)
+        return sent
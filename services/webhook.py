@@ -0,0 +1,27 @@
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from config.config import WebhookConfig
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def start_webhook(bot: Bot, dp: Dispatcher, config: WebhookConfig) -> web.AppRunner:
+    """Принимает апдейты Telegram по HTTP вместо long polling.
+
+    Экземпляров за балансировщиком может быть несколько: каждый регистрирует один и тот же
+    адрес, Telegram шлёт апдейт на него, а обработает его тот экземпляр, куда он попал.
+    """
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=config.secret).register(app, path=config.path)
+    setup_application(app, dp, bot=bot)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, config.host, config.port).start()
+
+    # накопившиеся апдейты не сбрасываем: рестарт одного из экземпляров
+    # не должен терять сообщения пользователей
+    await bot.set_webhook(config.url.rstrip('/') + config.path, secret_token=config.secret)
+    logger.info(f"[WEBHOOK] Апдейты принимаются на {config.host}:{config.port}{config.path}")
+    return runner
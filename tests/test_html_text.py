@@ -0,0 +1,54 @@
+"""html_to_text должен давать ровно тот же текст, что BeautifulSoup.get_text(): на нём обучены модели."""
+import json
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
+
+from services.html_text import html_to_text
+
+pytestmark = pytest.mark.filterwarnings('ignore', category=XMLParsedAsHTMLWarning)
+
+CORPUS_PATH = Path(__file__).parent.parent / 'bench' / 'corpus' / 'vacancies.json'
+
+CASES = [
+    '',
+    'просто текст',
+    '<p>Требования:</p><ul><li>Python</li><li>SQL</li></ul>',
+    '<p>  пробелы \n\n и\tтабы  </p>',
+    '<p>Зарплата&nbsp;от&nbsp;100&nbsp;000 &amp; бонусы &lt;тег&gt; &quot;кавычки&quot;</p>',
+    '&copy 2024 &unknownentity; &amp',
+    '&#150; тире, &#8212; длинное, &#x21; &#X41; &#128; &#153;',
+    '&#0; &#1114112; &#x110000; &#99999999999;',
+    '<![CDATA[сырые <данные>]]> после',
+    '<script>var x = "<p>не текст</p>";</script>видно',
+    '<style>p { color: red }</style><p>видно</p>',
+    '<template><b>шаблон</b></template>после шаблона',
+    '<?xml version="1.0"?><p>после инструкции</p>',
+    '<!-- комментарий --><p>после комментария</p>',
+    '<!DOCTYPE html><html><body><p>документ</p></body></html>',
+    '<p>незакрытый <b>тег <i>курсив',
+    '<p>лишний закрывающий</b></p></div>',
+    '<br><br/>строка<hr>ещё',
+    '<a href="https://hh.ru?a=1&b=2" title="&amp;">ссылка</a>',
+    '<p>a < b и c > d</p>',
+]
+
+
+def corpus_descriptions() -> list[str]:
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        return [item['description'] for item in json.load(f) if item.get('description')]
+
+
+def bs4_text(html: str) -> str:
+    return BeautifulSoup(html, 'html.parser').get_text()
+
+
+@pytest.mark.parametrize('html', CASES)
+def test_matches_beautifulsoup(html):
+    assert html_to_text(html) == bs4_text(html)
+
+
+@pytest.mark.parametrize('html', corpus_descriptions())
+def test_matches_beautifulsoup_on_corpus(html):
+    assert html_to_text(html) == bs4_text(html)